@@ -133,4 +133,11 @@ for hist in "${hists[@]}"; do
     --save_plot "$OUT/by_hist/hist_${hist}_iters_vs_gt_${MODE}_${ALIGN}.png"
 done
 
+# ---------- 4) Error profiles over time / distance ----------
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+suffix="raw"
+[[ "$ALIGN" == "aligned" ]] && suffix="se3"
+python3 "$SCRIPT_DIR/error_profiles.py" --root "$ROOT" --out "$OUT/profiles" \
+  --pattern "pg_ape_${suffix}" "pg_rpe_1m_${suffix}" "pg_rpe_50m_${suffix}"
+
 echo "Wrote plots under: $OUT"
@@ -1,48 +1,116 @@
 #!/usr/bin/env python3
+"""
+M(I,H) heatmaps, slices, surfaces, baseline deltas and Gamma for one pattern/metric.
+
+The matrix work (CSV parsing, baseline, delta/ratio, Gamma) uses only the
+standard library, and numpy/matplotlib are imported when the first figure is
+drawn. With --no-plots only the tables are written, which keeps the start-up
+of the 252 run_analyze.sh jobs to the interpreter itself.
+"""
+from __future__ import annotations
+
 import argparse
-import re
+import csv
+import math
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, Optional, Tuple, List
+from typing import Callable, Dict, Iterable, Optional, Tuple, List
+
+from cells import METRICS, infer_IH_from_path
 
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import cm
-import matplotlib.tri as mtri
 
+SIGNIFICANCE_METHODS = ("bootstrap", "permutation")  # significance.METHODS, without importing numpy
+
+
+def _pyplot():
+    """
+    matplotlib (pyplot, cm), imported on the first plot.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
+    return plt, cm
+
+
+class Matrix:
+    """
+    M(I,H) on sorted axes: index = I values (rows), columns = H values, NaN = missing.
+    """
 
-METRICS = ("rmse", "mean", "median", "std", "min", "max", "sse")
+    def __init__(self, index: List[int], columns: List[int], values: List[List[float]]):
+        self.index = list(index)
+        self.columns = list(columns)
+        self.values = values
+
+    @classmethod
+    def from_cells(cls, cells: Dict[Tuple[int, int], float]) -> "Matrix":
+        index = sorted({k[0] for k in cells})
+        columns = sorted({k[1] for k in cells})
+        return cls(index, columns, [[cells.get((I, H), math.nan) for H in columns] for I in index])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.index), len(self.columns)
+
+    def get(self, I: int, H: int) -> float:
+        if I not in self.index or H not in self.columns:
+            return math.nan
+        return self.values[self.index.index(I)][self.columns.index(H)]
+
+    def map(self, fn: Callable[[float], float]) -> "Matrix":
+        return Matrix(self.index, self.columns, [[fn(v) for v in row] for row in self.values])
+
+    def to_numpy(self):
+        import numpy as np
+        return np.array(self.values, dtype=float).reshape(self.shape)
+
+    def to_csv(self, path: Path, float_format: str = "%.6f") -> None:
+        """
+        Same layout as pandas DataFrame.to_csv (I index column, H header, NaN as empty).
+        """
+        with Path(path).open("w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow([""] + [str(H) for H in self.columns])
+            for I, row in zip(self.index, self.values):
+                w.writerow([str(I)] + ["" if math.isnan(v) else float_format % v for v in row])
+
+
+def _is_number(s: str) -> bool:
+    try:
+        float(s)
+        return True
+    except ValueError:
+        return False
 
 
-def infer_IH_from_path(p: Path) -> Tuple[int, int]:
+@lru_cache(maxsize=None)
+def read_table(csv_path: Path) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, ...], ...]]:
     """
-    Infer (I,H) from any parent folder named like '0_1', '10_2', '33_10', etc.
-    Searches upward in the path. Raises if not found.
+    (header, rows) of a small CSV, parsed once per path.
     """
-    for parent in [p.parent] + list(p.parents):
-        m = re.match(r"^(\d+)[_-](\d+)$", parent.name)
-        if m:
-            return int(m.group(1)), int(m.group(2))
-    raise ValueError(f"Cannot infer (I,H) from path: {p}")
+    with Path(csv_path).open(newline="", encoding="utf-8") as fh:
+        rows = [tuple(r) for r in csv.reader(fh) if r]
+    if not rows:
+        return (), ()
+    return rows[0], tuple(rows[1:])
 
 
-def _find_pattern_column(df: pd.DataFrame) -> str:
+def _find_pattern_column(header: Tuple[str, ...], rows: Tuple[Tuple[str, ...], ...]) -> int:
     """
     Try to find the column that stores 'pattern' strings (pg_ape_se3, zed_ape_se3, etc.).
-    Falls back to the first object/string-like column.
+    Falls back to the first string-like column.
     """
     preferred = ["pattern", "name", "key", "label", "metric", "id"]
     for c in preferred:
-        if c in df.columns:
-            return c
+        if c in header:
+            return header.index(c)
 
-    # fallback: first object column
-    obj_cols = [c for c in df.columns if df[c].dtype == object]
-    if obj_cols:
-        return obj_cols[0]
+    # fallback: first non-numeric column
+    for j in range(len(header)):
+        if any(j < len(r) and r[j] and not _is_number(r[j]) for r in rows):
+            return j
 
     # last resort: first column
-    return df.columns[0]
+    return 0
 
 
 def extract_value_from_csv(
@@ -57,27 +125,27 @@ def extract_value_from_csv(
     Returns None if not found / not parsable.
     """
     try:
-        df = pd.read_csv(csv_path)
+        header, rows = read_table(csv_path)
     except Exception:
         return None
 
-    if metric not in df.columns:
+    if metric not in header:
         return None
+    j = header.index(metric)
 
-    col = _find_pattern_column(df)
+    col = _find_pattern_column(header, rows)
+    names = [r[col] if col < len(r) else "" for r in rows]
 
-    s = df[col].astype(str)
-    mask = (s == pattern)
-    if not mask.any() and allow_contains:
-        mask = s.str.contains(re.escape(pattern), regex=True)
+    hits = [i for i, n in enumerate(names) if n == pattern]
+    if not hits and allow_contains:
+        hits = [i for i, n in enumerate(names) if pattern in n]
 
-    if not mask.any():
+    if not hits:
         return None
 
     # take the first match (your CSV typically has unique rows per pattern)
-    val = df.loc[mask, metric].iloc[0]
     try:
-        return float(val)
+        return float(rows[hits[0]][j])
     except Exception:
         return None
 
@@ -88,9 +156,9 @@ def build_matrix(
     pattern: str,
     metric: str,
     allow_contains: bool = False,
-) -> pd.DataFrame:
+) -> Matrix:
     """
-    Build M(I,H) matrix as DataFrame indexed by I and columns by H.
+    Build M(I,H) matrix indexed by I and columns by H.
     """
     values: Dict[Tuple[int, int], float] = {}
 
@@ -108,18 +176,11 @@ def build_matrix(
     if not values:
         raise RuntimeError(f"No values found for pattern='{pattern}', metric='{metric}'")
 
-    I_vals = sorted({k[0] for k in values.keys()})
-    H_vals = sorted({k[1] for k in values.keys()})
-
-    mat = pd.DataFrame(index=I_vals, columns=H_vals, dtype=float)
-    for (I, H), v in values.items():
-        mat.loc[I, H] = v
-
-    return mat.sort_index().sort_index(axis=1)
+    return Matrix.from_cells(values)
 
 
 def plot_heatmap(
-    mat: pd.DataFrame,
+    mat: Matrix,
     *,
     title: str,
     outpath: Path,
@@ -127,10 +188,15 @@ def plot_heatmap(
     annotate: bool = True,
     vmin: Optional[float] = None,
     vmax: Optional[float] = None,
+    hatch: Optional[List[List[bool]]] = None,
 ) -> None:
+    import numpy as np
+    from matplotlib.patches import Rectangle
+    plt, cm = _pyplot()
+
     fig, ax = plt.subplots(figsize=(7.8, 5.4))
 
-    data = mat.to_numpy(dtype=float)
+    data = mat.to_numpy()
     im = ax.imshow(
         data,
         origin="lower",
@@ -145,9 +211,9 @@ def plot_heatmap(
     ax.set_ylabel("I (iterations)")
 
     ax.set_xticks(np.arange(mat.shape[1]))
-    ax.set_xticklabels([str(h) for h in mat.columns.tolist()])
+    ax.set_xticklabels([str(h) for h in mat.columns])
     ax.set_yticks(np.arange(mat.shape[0]))
-    ax.set_yticklabels([str(i) for i in mat.index.tolist()])
+    ax.set_yticklabels([str(i) for i in mat.index])
 
     cbar = fig.colorbar(im, ax=ax, shrink=0.85, pad=0.02)
     cbar.set_label("metric")
@@ -159,13 +225,19 @@ def plot_heatmap(
                 if np.isfinite(v):
                     ax.text(xi, yi, f"{v:.3f}", ha="center", va="center", fontsize=8)
 
+    # hatch: boolean mask of cells to mark (e.g. not significant)
+    if hatch is not None:
+        for yi, xi in zip(*np.nonzero(np.asarray(hatch, dtype=bool))):
+            ax.add_patch(Rectangle((xi - 0.5, yi - 0.5), 1.0, 1.0, fill=False, hatch="///",
+                                   edgecolor="0.35", linewidth=0.0))
+
     fig.tight_layout()
     fig.savefig(outpath, dpi=200)
     plt.close(fig)
 
 
 def plot_slices(
-    mat: pd.DataFrame,
+    mat: Matrix,
     *,
     title: str,
     outpath: Path,
@@ -178,12 +250,16 @@ def plot_slices(
       right: M vs H for each I
     (This supports your marginal analysis in the thesis.)
     """
+    import numpy as np
+    plt, _ = _pyplot()
+
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(11.5, 4.8))
+    data = mat.to_numpy()
 
     # left: for each H line over I
-    I_vals = mat.index.to_numpy(dtype=float)
-    for H in mat.columns:
-        y = mat[H].to_numpy(dtype=float)
+    I_vals = np.asarray(mat.index, dtype=float)
+    for j, H in enumerate(mat.columns):
+        y = data[:, j]
         ax1.plot(I_vals, y, marker="o", label=f"H={H}")
     ax1.set_title("Slices over I (fixed H)")
     ax1.set_xlabel("I (iterations)")
@@ -193,9 +269,9 @@ def plot_slices(
         ax1.axhline(baseline, linestyle="--", linewidth=1.5, label=baseline_label)
 
     # right: for each I line over H
-    H_vals = mat.columns.to_numpy(dtype=float)
-    for I in mat.index:
-        y = mat.loc[I].to_numpy(dtype=float)
+    H_vals = np.asarray(mat.columns, dtype=float)
+    for i, I in enumerate(mat.index):
+        y = data[i]
         ax2.plot(H_vals, y, marker="o", label=f"I={I}")
     ax2.set_title("Slices over H (fixed I)")
     ax2.set_xlabel("H (history)")
@@ -214,7 +290,7 @@ def plot_slices(
 
 
 def plot_surface_3d_smooth(
-    mat: pd.DataFrame,
+    mat: Matrix,
     *,
     title: str,
     outpath: Path,
@@ -226,11 +302,14 @@ def plot_surface_3d_smooth(
     Smoothed 3D surface via triangular interpolation (continuous-looking even for 4x4 grid).
     Colored with heatmap-like colormap.
     """
-    # Prepare scattered points
-    mat = mat.sort_index().sort_index(axis=1)
-    H_vals = mat.columns.to_numpy(dtype=float)
-    I_vals = mat.index.to_numpy(dtype=float)
-    Z = mat.to_numpy(dtype=float)
+    import numpy as np
+    import matplotlib.tri as mtri
+    plt, cm = _pyplot()
+
+    # Prepare scattered points (Matrix axes are sorted)
+    H_vals = np.asarray(mat.columns, dtype=float)
+    I_vals = np.asarray(mat.index, dtype=float)
+    Z = mat.to_numpy()
 
     Xc, Yc = np.meshgrid(H_vals, I_vals)
     xc = Xc.ravel()
@@ -314,9 +393,9 @@ def baseline_scalar_from_files(
         baseline_ref = "mean"
 
     # mean over all (should be constant anyway)
-    return float(np.mean([v for _, v in vals]))
+    return sum(v for _, v in vals) / len(vals)
 
-def compute_superposition_gamma(mat: pd.DataFrame) -> pd.DataFrame:
+def compute_superposition_gamma(mat: Matrix) -> Matrix:
     """
     Gamma(I,H) = M(I,H) - M(I,1) - M(0,H) + M(0,1)
     Requires that I=0 exists in index and H=1 exists in columns.
@@ -326,12 +405,14 @@ def compute_superposition_gamma(mat: pd.DataFrame) -> pd.DataFrame:
     if 1 not in mat.columns:
         raise RuntimeError("Superposition needs H=1 column in the matrix.")
 
-    M01 = float(mat.loc[0, 1])
-    MI1 = mat[1]          # column at H=1, indexed by I
-    M0H = mat.loc[0]      # row at I=0, indexed by H
+    i0, h1 = mat.index.index(0), mat.columns.index(1)
+    M01 = mat.values[i0][h1]
+    MI1 = [row[h1] for row in mat.values]   # column at H=1, indexed by I
+    M0H = mat.values[i0]                    # row at I=0, indexed by H
 
-    gamma = mat.subtract(MI1, axis=0).subtract(M0H, axis=1).add(M01)
-    return gamma
+    return Matrix(mat.index, mat.columns, [
+        [v - MI1[i] - M0H[j] + M01 for j, v in enumerate(row)] for i, row in enumerate(mat.values)
+    ])
 
 def main() -> None:
     ap = argparse.ArgumentParser()
@@ -342,6 +423,8 @@ def main() -> None:
     ap.add_argument("--allow-contains", action="store_true", help="Pattern match using contains if exact match fails")
 
     # outputs
+    ap.add_argument("--no-plots", action="store_true",
+                    help="Compute-only: write the matrix, baseline, delta/ratio and Gamma CSVs, no figures")
     ap.add_argument("--surface", action="store_true", help="Also write 3D surface plot")
     ap.add_argument("--elev", type=float, default=28.0, help="3D view elevation")
     ap.add_argument("--azim", type=float, default=-55.0, help="3D view azimuth")
@@ -354,12 +437,20 @@ def main() -> None:
     ap.add_argument("--delta-cmap", default="coolwarm", help="Colormap for improvement heatmap (delta), default: coolwarm")
     ap.add_argument("--ratio-cmap", default="viridis", help="Colormap for ratio heatmap, default: viridis")
 
+    # significance of the delta (per-pose error arrays in the evo zips)
+    ap.add_argument("--significance", default=None, choices=SIGNIFICANCE_METHODS,
+                    help="Test PG vs baseline per cell and hatch non-significant delta/ratio cells")
+    ap.add_argument("--resamples", type=int, default=10000, help="Bootstrap / permutation resamples")
+    ap.add_argument("--block", type=int, default=0, help="Block length in samples (0: n^(1/3))")
+    ap.add_argument("--alpha", type=float, default=0.05, help="Significance level")
+
     ap.add_argument("--gamma", action="store_true",
                     help="Write superposition deviation Gamma(I,H) as CSV (and optionally heatmap).")
     ap.add_argument("--gamma-heatmap", action="store_true",
                     help="Also write a heatmap for Gamma(I,H).")
 
     args = ap.parse_args()
+    plots = not args.no_plots
 
     files = [Path(x) for x in args.files]
     outdir = Path(args.outdir)
@@ -367,6 +458,7 @@ def main() -> None:
 
     # PG matrix
     mat_pg = build_matrix(files, pattern=args.pattern, metric=args.metric, allow_contains=args.allow_contains)
+    mat_pg.to_csv(outdir / f"matrix_{args.pattern}_{args.metric}.csv")
 
     # Optional baseline scalar
     baseline_val: Optional[float] = None
@@ -378,25 +470,29 @@ def main() -> None:
             baseline_ref=args.baseline_ref,
             allow_contains=args.allow_contains,
         )
+        with (outdir / f"baseline_{args.baseline_pattern}_{args.metric}.csv").open("w", newline="", encoding="utf-8") as fh:
+            csv.writer(fh).writerows([["pattern", "metric", "ref", "value"],
+                                      [args.baseline_pattern, args.metric, args.baseline_ref, f"{baseline_val:.6f}"]])
 
     # ---- core outputs: heatmap + slices + (optional) surface ----
-    plot_heatmap(
-        mat_pg,
-        title=f"{args.pattern} :: {args.metric}",
-        outpath=outdir / f"heatmap_{args.pattern}_{args.metric}.png",
-        cmap_name=args.cmap,
-        annotate=True,
-    )
+    if plots:
+        plot_heatmap(
+            mat_pg,
+            title=f"{args.pattern} :: {args.metric}",
+            outpath=outdir / f"heatmap_{args.pattern}_{args.metric}.png",
+            cmap_name=args.cmap,
+            annotate=True,
+        )
 
-    plot_slices(
-        mat_pg,
-        title=f"{args.pattern} :: {args.metric}",
-        outpath=outdir / f"slices_{args.pattern}_{args.metric}.png",
-        baseline=baseline_val,
-        baseline_label=f"{args.baseline_pattern} baseline" if args.baseline_pattern else "baseline",
-    )
+        plot_slices(
+            mat_pg,
+            title=f"{args.pattern} :: {args.metric}",
+            outpath=outdir / f"slices_{args.pattern}_{args.metric}.png",
+            baseline=baseline_val,
+            baseline_label=f"{args.baseline_pattern} baseline" if args.baseline_pattern else "baseline",
+        )
 
-    if args.surface:
+    if plots and args.surface:
         plot_surface_3d_smooth(
             mat_pg,
             title=f"{args.pattern} :: {args.metric} (3D surface)",
@@ -408,26 +504,55 @@ def main() -> None:
 
     # ---- baseline-vs-PG comparison outputs (meaningful) ----
     if baseline_val is not None:
-        delta = baseline_val - mat_pg
-        ratio = delta / baseline_val
-
-        plot_heatmap(
-            delta,
-            title=f"Δ vs baseline: {args.baseline_pattern} - {args.pattern} :: {args.metric}",
-            outpath=outdir / f"heatmap_delta_vs_{args.baseline_pattern}_{args.pattern}_{args.metric}.png",
-            cmap_name=args.delta_cmap,
-            annotate=True,
-        )
+        delta = mat_pg.map(lambda v: baseline_val - v)
+        ratio = delta.map(lambda v: v / baseline_val)
+        delta.to_csv(outdir / f"delta_vs_{args.baseline_pattern}_{args.pattern}_{args.metric}.csv")
+        ratio.to_csv(outdir / f"ratio_vs_{args.baseline_pattern}_{args.pattern}_{args.metric}.csv")
+
+        not_sig = None
+        if args.significance:
+            from significance import test_cells
+
+            cells = test_cells(
+                files,
+                pattern=args.pattern,
+                baseline_pattern=args.baseline_pattern,
+                metrics=[args.metric],
+                method=args.significance,
+                resamples=args.resamples,
+                block=args.block,
+                alpha=args.alpha,
+            )
+            cols = ["I", "H", "n", "block", "delta", "ci_lo", "ci_hi", "p"]
+            with (outdir / f"significance_{args.pattern}_{args.metric}.csv").open("w", newline="", encoding="utf-8") as fh:
+                w = csv.writer(fh)
+                w.writerow(cols)
+                for (I, H), r in sorted(cells.items()):
+                    res = {"I": I, "H": H, **r[args.metric]}
+                    w.writerow([res[c] if c in ("I", "H", "n", "block") else f"{res[c]:.6g}" for c in cols])
+            p = Matrix.from_cells({IH: r[args.metric]["p"] for IH, r in cells.items()})
+            not_sig = [[not (p.get(I, H) < args.alpha) for H in delta.columns] for I in delta.index]
+
+        if plots:
+            plot_heatmap(
+                delta,
+                title=f"Δ vs baseline: {args.baseline_pattern} - {args.pattern} :: {args.metric}",
+                outpath=outdir / f"heatmap_delta_vs_{args.baseline_pattern}_{args.pattern}_{args.metric}.png",
+                cmap_name=args.delta_cmap,
+                annotate=True,
+                hatch=not_sig,
+            )
 
-        plot_heatmap(
-            ratio * 100.0,
-            title=f"Relative gain (%) vs baseline: {args.baseline_pattern} vs {args.pattern} :: {args.metric}",
-            outpath=outdir / f"heatmap_ratio_vs_{args.baseline_pattern}_{args.pattern}_{args.metric}.png",
-            cmap_name=args.ratio_cmap,
-            annotate=True,
-        )
+            plot_heatmap(
+                ratio.map(lambda v: v * 100.0),
+                title=f"Relative gain (%) vs baseline: {args.baseline_pattern} vs {args.pattern} :: {args.metric}",
+                outpath=outdir / f"heatmap_ratio_vs_{args.baseline_pattern}_{args.pattern}_{args.metric}.png",
+                cmap_name=args.ratio_cmap,
+                annotate=True,
+                hatch=not_sig,
+            )
 
-        if args.surface:
+        if plots and args.surface:
             plot_surface_3d_smooth(
                 delta,
                 title=f"Δ surface vs baseline: {args.baseline_pattern} - {args.pattern} :: {args.metric}",
@@ -442,10 +567,10 @@ def main() -> None:
         gamma_csv = outdir / f"gamma_{args.pattern}_{args.metric}.csv"
         gamma.to_csv(gamma_csv, float_format="%.6f")
 
-        if args.gamma_heatmap:
+        if plots and args.gamma_heatmap:
             # symmetric color limits around 0 look best for +/- deviations
-            g = gamma.to_numpy(dtype=float)
-            gabs = np.nanmax(np.abs(g[np.isfinite(g)])) if np.isfinite(g).any() else None
+            finite = [abs(v) for row in gamma.values for v in row if math.isfinite(v)]
+            gabs = max(finite) if finite else None
             plot_heatmap(
                 gamma,
                 title=f"Gamma (superposition deviation): {args.pattern} :: {args.metric}",
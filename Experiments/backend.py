@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Array/FFT backends for the offline PG math.
+
+  numpy    numpy.fft (single-threaded, always available)
+  scipy    scipy.fft with a worker-thread pool
+  pyfftw   FFTW through pyFFTW builders, plans cached per (kind, shape, dtype)
+  cupy     CuPy on the GPU (optional; arrays are moved to the device and back)
+
+The backend is picked once at startup (--backend, or the PG_BACKEND
+environment variable) and passed down to pg_offline. DMF fit/merge is pure
+elementwise NumPy and is shared by all CPU backends.
+
+Run `python3 backend.py` to benchmark every installed backend on the same frames.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from precision import DEFAULT_PRECISION, PRECISIONS
+
+
+BACKENDS = ("numpy", "scipy", "pyfftw", "cupy")
+
+
+class NumpyBackend:
+    name = "numpy"
+
+    def __init__(self, threads: int = 1):
+        self.threads = 1
+        self.xp = np
+
+    def rfft2(self, a):
+        return np.fft.rfft2(a)
+
+    def irfft2(self, a, s: Tuple[int, int]):
+        return np.fft.irfft2(a, s=s)
+
+    def asarray(self, a, dtype=None):
+        return np.asarray(a, dtype=dtype)
+
+    def to_host(self, a) -> np.ndarray:
+        return a
+
+
+class ScipyBackend(NumpyBackend):
+    name = "scipy"
+
+    def __init__(self, threads: int = 1):
+        from scipy import fft
+        super().__init__()
+        self._fft = fft
+        self.threads = threads
+
+    def rfft2(self, a):
+        return self._fft.rfft2(a, workers=self.threads)
+
+    def irfft2(self, a, s: Tuple[int, int]):
+        return self._fft.irfft2(a, s=s, workers=self.threads)
+
+
+class FFTWBackend(NumpyBackend):
+    """
+    Outputs are the plans' own buffers and are overwritten by the next call
+    of the same transform; PG copies everything it keeps.
+    """
+    name = "pyfftw"
+
+    def __init__(self, threads: int = 1, planner_effort: str = "FFTW_MEASURE"):
+        import pyfftw
+        super().__init__()
+        self._builders = pyfftw.builders
+        self._empty = pyfftw.empty_aligned
+        self.threads = threads
+        self.planner_effort = planner_effort
+        self._plans: Dict[Tuple, Any] = {}
+
+    def _plan(self, kind: str, shape: Tuple[int, ...], dtype, s=None):
+        key = (kind, shape, np.dtype(dtype).str, s)
+        plan = self._plans.get(key)
+        if plan is None:
+            buf = self._empty(shape, dtype=dtype)
+            build = self._builders.rfft2 if kind == "r" else self._builders.irfft2
+            kw = {} if s is None else {"s": s}
+            plan = build(buf, threads=self.threads, planner_effort=self.planner_effort,
+                         overwrite_input=True, auto_align_input=True, **kw)
+            self._plans[key] = plan
+        return plan
+
+    def rfft2(self, a):
+        return self._plan("r", a.shape, a.dtype)(a)
+
+    def irfft2(self, a, s: Tuple[int, int]):
+        return self._plan("i", a.shape, a.dtype, tuple(s))(a)
+
+
+class CupyBackend:
+    name = "cupy"
+
+    def __init__(self, threads: int = 1):
+        import cupy
+        self.threads = threads
+        self.xp = cupy
+
+    def rfft2(self, a):
+        return self.xp.fft.rfft2(a)
+
+    def irfft2(self, a, s: Tuple[int, int]):
+        return self.xp.fft.irfft2(a, s=s)
+
+    def asarray(self, a, dtype=None):
+        return self.xp.asarray(a, dtype=dtype)
+
+    def to_host(self, a) -> np.ndarray:
+        return self.xp.asnumpy(a)
+
+
+_CLASSES: Dict[str, Callable[..., Any]] = {
+    "numpy": NumpyBackend,
+    "scipy": ScipyBackend,
+    "pyfftw": FFTWBackend,
+    "cupy": CupyBackend,
+}
+
+
+def get_backend(name: Optional[str] = None, threads: Optional[int] = None):
+    """
+    Instantiate a backend. name defaults to $PG_BACKEND, else scipy with a
+    NumPy fallback; threads defaults to $PG_THREADS, else the CPU count.
+    """
+    if threads is None:
+        threads = int(os.environ.get("PG_THREADS", os.cpu_count() or 1))
+    name = name or os.environ.get("PG_BACKEND")
+    if name is None:
+        try:
+            return ScipyBackend(threads)
+        except ImportError:
+            return NumpyBackend(threads)
+    if name not in _CLASSES:
+        raise ValueError(f"Unknown backend '{name}', expected one of {BACKENDS}")
+    try:
+        return _CLASSES[name](threads)
+    except ImportError as e:
+        raise SystemExit(f"Backend '{name}' is not installed ({e.name})") from e
+
+
+_default = None
+
+
+def default_backend():
+    """
+    Process-wide backend used when none is passed explicitly.
+    """
+    global _default
+    if _default is None:
+        _default = get_backend()
+    return _default
+
+
+def available_backends(threads: int) -> List[Any]:
+    out = []
+    for name in BACKENDS:
+        try:
+            out.append(_CLASSES[name](threads))
+        except ImportError:
+            pass
+    return out
+
+
+def main() -> None:
+    from pg_offline import load_frame, lowpass_mask, pg_checkpoints
+
+    ap = argparse.ArgumentParser(description="Benchmark PG on every installed array/FFT backend.")
+    ap.add_argument("--frames", nargs="*", default=[], help="PG frame .npz files (zed, lidar, mask)")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--iterations", type=int, default=33, help="PG iterations I")
+    ap.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--precision", default=DEFAULT_PRECISION, choices=sorted(PRECISIONS))
+    args = ap.parse_args()
+
+    if args.frames:
+        frames = [load_frame(Path(f)) for f in args.frames]
+    else:
+        rng = np.random.default_rng(0)
+        frames = []
+        for _ in range(2):
+            zed = (2.0 + 8.0 * rng.random((args.height, args.width))).astype(np.float32)
+            lidar = np.where(rng.random(zed.shape) < 0.03, zed, np.nan).astype(np.float32)
+            frames.append((zed, lidar, rng.random(zed.shape) < 0.05))
+    lpf = lowpass_mask(frames[0][0].shape)
+
+    backends = available_backends(args.threads)
+    missing = [b for b in BACKENDS if b not in {x.name for x in backends}]
+    ref: Optional[List[np.ndarray]] = None
+    base = None
+    print(f"frames: {len(frames)}  I: {args.iterations}  threads: {args.threads}  precision: {args.precision}")
+    print(f"{'backend':>8} {'ms/frame':>9} {'speedup':>8} {'max_dev':>10}")
+    for be in backends:
+        run = lambda f: pg_checkpoints(*f, [args.iterations], lpf=lpf, precision=args.precision,
+                                       backend=be)[args.iterations]
+        run(frames[0])  # plan / warm-up
+        t0 = time.perf_counter()
+        outs = [run(f) for f in frames]
+        t = (time.perf_counter() - t0) / len(frames)
+        if ref is None:
+            ref, base = outs, t
+        dev = max(float(np.nanmax(np.abs(o.astype(np.float64) - r))) for o, r in zip(outs, ref))
+        print(f"{be.name:>8} {t * 1e3:>9.1f} {base / t:>8.2f} {dev:>10.2e}")
+    if missing:
+        print(f"not installed: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
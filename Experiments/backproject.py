@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Depth image -> point cloud back-projection with a cached ray grid.
+
+For pixel (v,u) with depth d the published point is
+  x' = d,  y' = -(u - c_x) d / f_x,  z' = -(v - c_y) d / f_y
+so p'(v,u) = d * r(v,u) with r = (1, -(u - c_x)/f_x, -(v - c_y)/f_y). The ray
+grid r depends only on (width, height, intrinsics, crop, stride); it is built
+once per key and reused, and every frame is one broadcast multiply into a
+reusable (rows, cols, 3) buffer followed by an optional NaN-skipping compaction.
+
+Run `python3 backproject.py` for a frames/second benchmark against the
+per-frame recomputation.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, Mapping, Tuple
+
+import numpy as np
+
+from dmf_stage import Crop
+
+_RAYS: Dict[Tuple, np.ndarray] = {}
+
+NO_CROP = Crop(0, 0, 0, 0)
+
+
+def ray_grid(
+    width: int,
+    height: int,
+    fx: float,
+    fy: float,
+    cx: float,
+    cy: float,
+    crop: Crop = NO_CROP,
+    stride: int = 1,
+) -> np.ndarray:
+    """
+    Read-only (rows, cols, 3) float32 grid of remapped unit-depth rays, cached per key.
+    """
+    key = (int(width), int(height), float(fx), float(fy), float(cx), float(cy), tuple(crop), int(stride))
+    rays = _RAYS.get(key)
+    if rays is None:
+        u = np.arange(crop.left, width - crop.right, stride, dtype=np.float64)
+        v = np.arange(crop.top, height - crop.bottom, stride, dtype=np.float64)
+        rays = np.empty((v.size, u.size, 3), dtype=np.float32)
+        rays[..., 0] = 1.0
+        rays[..., 1] = -(u[None, :] - cx) / fx
+        rays[..., 2] = -(v[:, None] - cy) / fy
+        rays.setflags(write=False)
+        _RAYS[key] = rays
+    return rays
+
+
+class BackProjector:
+    """
+    Back-projection for one camera / crop / stride; owns the output buffer.
+    """
+
+    def __init__(self, width: int, height: int, fx: float, fy: float, cx: float, cy: float,
+                 *, crop: Crop = NO_CROP, stride: int = 1):
+        if stride < 1:
+            raise ValueError("stride must be >= 1")
+        self.width, self.height = int(width), int(height)
+        self.crop = crop
+        self.stride = int(stride)
+        self.rays = ray_grid(width, height, fx, fy, cx, cy, crop, stride)
+        self._rows = slice(crop.top, self.height - crop.bottom, self.stride)
+        self._cols = slice(crop.left, self.width - crop.right, self.stride)
+        self._xyz = np.empty(self.rays.shape, dtype=np.float32)
+        # one 12-byte record per pixel: boolean compaction copies whole points
+        self._points = self._xyz.view(np.dtype((np.void, 12))).reshape(self.rays.shape[:2])
+
+    @classmethod
+    def from_camera_info(cls, info: Mapping, **kwargs) -> "BackProjector":
+        K = np.asarray(info["K"], dtype=float).reshape(3, 3)
+        return cls(info["width"], info["height"], K[0, 0], K[1, 1], K[0, 2], K[1, 2], **kwargs)
+
+    def project(self, depth: np.ndarray, *, compact: bool = True) -> np.ndarray:
+        """
+        Depth (height, width) -> (N, 3) points in the published frame.
+
+        compact=True returns only finite pixels (a new array); compact=False
+        returns a view of the internal buffer with NaN rows for empty pixels,
+        overwritten by the next call.
+        """
+        d = depth[self._rows, self._cols]
+        np.multiply(self.rays, d[..., None], out=self._xyz)
+        if not compact:
+            return self._xyz.reshape(-1, 3)
+        return self._points[np.isfinite(d)].view(np.float32).reshape(-1, 3)
+
+
+def backproject_naive(depth: np.ndarray, fx: float, fy: float, cx: float, cy: float) -> np.ndarray:
+    """
+    Per-frame recomputation of the pixel grid, used by the benchmark.
+    """
+    v, u = np.indices(depth.shape)
+    X = (u - cx) * depth / fx
+    Y = (v - cy) * depth / fy
+    pts = np.stack([depth, -X, -Y], axis=-1).reshape(-1, 3)
+    return pts[np.isfinite(pts).all(axis=1)]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark cached ray-grid back-projection (frames/second).")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--fx", type=float, default=525.0)
+    ap.add_argument("--fy", type=float, default=525.0)
+    ap.add_argument("--cx", type=float, default=640.0)
+    ap.add_argument("--cy", type=float, default=360.0)
+    ap.add_argument("--crop", nargs=4, type=int, default=[0, 0, 0, 0], metavar=("TOP", "BOTTOM", "LEFT", "RIGHT"))
+    ap.add_argument("--stride", type=int, default=1, help="Keep every n-th row and column")
+    ap.add_argument("--nan-fraction", type=float, default=0.1, help="Fraction of empty pixels in the synthetic depth")
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    depth = (2.0 + 8.0 * rng.random((args.height, args.width))).astype(np.float32)
+    depth[rng.random(depth.shape) < args.nan_fraction] = np.nan
+
+    bp = BackProjector(args.width, args.height, args.fx, args.fy, args.cx, args.cy,
+                       crop=Crop(*args.crop), stride=args.stride)
+
+    def fps(fn) -> float:
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return args.repeat / (time.perf_counter() - t0)
+
+    f_naive = fps(lambda: backproject_naive(depth, args.fx, args.fy, args.cx, args.cy))
+    f_compact = fps(lambda: bp.project(depth))
+    f_dense = fps(lambda: bp.project(depth, compact=False))
+
+    n = bp.project(depth).shape[0]
+    if tuple(args.crop) == (0, 0, 0, 0) and args.stride == 1:
+        err = float(np.abs(bp.project(depth) - backproject_naive(depth, args.fx, args.fy, args.cx, args.cy)).max())
+        check = f"  max |diff| vs naive: {err:.2e}"
+    else:
+        check = ""
+    print(f"image: {args.width}x{args.height}  stride: {args.stride}  points/frame: {n}{check}")
+    print(f"naive per-frame grid: {f_naive:8.1f} fps")
+    print(f"cached rays, compact: {f_compact:8.1f} fps  ({f_compact / f_naive:.1f}x)")
+    print(f"cached rays, dense:   {f_dense:8.1f} fps  ({f_dense / f_naive:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
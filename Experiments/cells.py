@@ -0,0 +1,26 @@
+"""
+(I,H) sweep layout shared by analyze.py and the tools built on it: the metric
+columns of the evo_res tables and the <I>_<H> folder naming. Standard library
+only, so significance.py can import it without re-running analyze.py when that
+is the __main__ script.
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Tuple
+
+
+METRICS = ("rmse", "mean", "median", "std", "min", "max", "sse")
+
+
+def infer_IH_from_path(p: Path) -> Tuple[int, int]:
+    """
+    Infer (I,H) from any parent folder named like '0_1', '10_2', '33_10', etc.
+    Searches upward in the path. Raises if not found.
+    """
+    for parent in [p.parent] + list(p.parents):
+        m = re.match(r"^(\d+)[_-](\d+)$", parent.name)
+        if m:
+            return int(m.group(1)), int(m.group(2))
+    raise ValueError(f"Cannot infer (I,H) from path: {p}")
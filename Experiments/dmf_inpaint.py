@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+NaN-aware inpainting of the raw ZED depth D_ZED^orig for DMF preprocessing.
+
+All methods take D_ZED^orig (NaN / +-inf where invalid) and return the filled
+depth; the invalidity mask M(v,u) is not changed and is reapplied downstream
+as before. Pixels a method cannot reach (beyond T diffusion steps, outside the
+normconv kernel support) stay NaN, so each method is timed and scored on its
+own. DMF and PG need finite input: the caller (replay.py) runs fill_unreached,
+the nearest valid value, on what is left. A frame without any valid pixel is
+returned unchanged (all non-finite).
+
+  diffusion   T iterations of 4-neighbour averaging (the node's baseline)
+  nearest     nearest valid pixel via a Euclidean distance transform
+  normconv    normalized convolution with a Gaussian applicability
+  pushpull    multigrid push-pull over a weighted 2x2 pyramid
+
+Run `python3 dmf_inpaint.py --frames zed/*.npy` to compare runtime and fill
+error (on artificially hidden valid pixels) against the diffusion baseline;
+the `unfilled` column counts the pixels a method left non-finite.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+from scipy import ndimage
+
+
+def invalid_mask(depth: np.ndarray) -> np.ndarray:
+    """
+    M(v,u) = 1 where the depth is NaN or +-inf.
+    """
+    return ~np.isfinite(depth)
+
+
+def fill_unreached(filled: np.ndarray, reached: np.ndarray) -> np.ndarray:
+    """
+    Give every pixel outside `reached` the value of the nearest reached pixel
+    (one EDT pass), in place. No-op when everything or nothing was reached.
+    """
+    if reached.all() or not reached.any():
+        return filled
+    idx = ndimage.distance_transform_edt(~reached, return_distances=False, return_indices=True)
+    rest = ~reached
+    filled[rest] = filled[tuple(i[rest] for i in idx)]
+    return filled
+
+
+def inpaint_diffusion(depth: np.ndarray, iterations: int = 50, eps: float = 1e-6) -> np.ndarray:
+    """
+    Baseline: every iteration, each still-unknown pixel takes the mean of its
+    known 4-neighbours; pixels filled in one iteration are known in the next.
+    Valid pixels are never modified; pixels the front does not reach in T
+    iterations stay NaN.
+    """
+    known = np.isfinite(depth)
+    d = np.where(known, depth, 0.0)
+    w = known.astype(d.dtype)
+    for _ in range(iterations):
+        if known.all():
+            break
+        acc = np.zeros_like(d)
+        cnt = np.zeros_like(d)
+        acc[1:, :] += d[:-1, :]; cnt[1:, :] += w[:-1, :]
+        acc[:-1, :] += d[1:, :]; cnt[:-1, :] += w[1:, :]
+        acc[:, 1:] += d[:, :-1]; cnt[:, 1:] += w[:, :-1]
+        acc[:, :-1] += d[:, 1:]; cnt[:, :-1] += w[:, 1:]
+        new = ~known & (cnt > 0)
+        d[new] = acc[new] / (cnt[new] + eps)
+        known |= new
+        w = known.astype(d.dtype)
+    d[~known] = np.nan
+    return d
+
+
+def inpaint_nearest(depth: np.ndarray) -> np.ndarray:
+    """
+    Copy the nearest valid pixel into every invalid one (one EDT pass).
+    """
+    valid = np.isfinite(depth)
+    if valid.all() or not valid.any():
+        return depth.copy()
+    idx = ndimage.distance_transform_edt(~valid, return_distances=False, return_indices=True)
+    return depth[tuple(idx)]
+
+
+def inpaint_normconv(depth: np.ndarray, sigma: float = 4.0) -> np.ndarray:
+    """
+    Normalized convolution: G*(D*W) / G*W with W the validity mask. Pixels the
+    kernel cannot reach stay NaN.
+    """
+    valid = np.isfinite(depth)
+    if valid.all() or not valid.any():
+        return depth.copy()
+    w = valid.astype(np.float64)
+    num = ndimage.gaussian_filter(np.where(valid, depth, 0.0), sigma, mode="nearest", truncate=3.0)
+    den = ndimage.gaussian_filter(w, sigma, mode="nearest", truncate=3.0)
+    out = np.where(valid, depth, np.nan)
+    reach = ~valid & (den > 1e-6)
+    out[reach] = num[reach] / den[reach]
+    return out
+
+
+def _push(d: np.ndarray, w: np.ndarray):
+    rows, cols = d.shape
+    # pad to even size by edge replication with zero weight
+    pr, pc = rows % 2, cols % 2
+    if pr or pc:
+        d = np.pad(d, ((0, pr), (0, pc)), mode="edge")
+        w = np.pad(w, ((0, pr), (0, pc)), mode="constant")
+    dw = (d * w).reshape(d.shape[0] // 2, 2, d.shape[1] // 2, 2).sum(axis=(1, 3))
+    ws = w.reshape(w.shape[0] // 2, 2, w.shape[1] // 2, 2).sum(axis=(1, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dc = np.where(ws > 0, dw / ws, 0.0)
+    return dc, np.minimum(ws, 1.0)
+
+
+def inpaint_pushpull(depth: np.ndarray) -> np.ndarray:
+    """
+    Push: weighted 2x2 averages down to a level with no holes (at the latest
+    1x1, which holds the mean of all valid pixels). Pull: fill each level's
+    holes from the upsampled coarser level, blended by the level's own weight.
+    """
+    valid = np.isfinite(depth)
+    if valid.all() or not valid.any():
+        return depth.copy()
+    levels: List[tuple] = [(np.where(valid, depth, 0.0).astype(np.float64), valid.astype(np.float64))]
+    while max(levels[-1][0].shape) > 1 and (levels[-1][1] < 1.0).any():
+        levels.append(_push(*levels[-1]))
+
+    d_up = levels[-1][0]
+    for d, w in reversed(levels[:-1]):
+        up = np.repeat(np.repeat(d_up, 2, axis=0), 2, axis=1)[:d.shape[0], :d.shape[1]]
+        d_up = w * d + (1.0 - w) * up
+    out = np.array(depth, dtype=np.float64, copy=True)
+    out[~valid] = d_up[~valid]
+    return out
+
+
+METHODS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "diffusion": inpaint_diffusion,
+    "nearest": inpaint_nearest,
+    "normconv": inpaint_normconv,
+    "pushpull": inpaint_pushpull,
+}
+
+
+def load_depth(path: Path, key: str) -> np.ndarray:
+    if path.suffix == ".npz":
+        with np.load(path) as z:
+            return np.asarray(z[key], dtype=np.float64)
+    return np.asarray(np.load(path), dtype=np.float64)
+
+
+def synthetic_frame(rng: np.random.Generator, shape=(720, 1280)) -> np.ndarray:
+    v, u = np.mgrid[0:shape[0], 0:shape[1]]
+    d = 2.0 + 8.0 * v / shape[0] + 0.5 * np.sin(u / 40.0)
+    holes = ndimage.binary_dilation(rng.random(shape) < 0.002, iterations=12)
+    d[holes] = np.nan
+    # sky band: wider than the reach of T=50 diffusion steps
+    d[:shape[0] // 6] = np.nan
+    return d
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare ZED depth inpainting strategies against 4-neighbour diffusion.")
+    ap.add_argument("--frames", nargs="*", default=[], help="Recorded ZED depth frames (.npy, or .npz with --key)")
+    ap.add_argument("--key", default="zed_orig", help="Array name inside .npz frames")
+    ap.add_argument("--iterations", type=int, default=50, help="Diffusion baseline iterations T")
+    ap.add_argument("--hide", type=float, default=0.02, help="Fraction of valid pixels hidden (as blobs) for scoring")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames = [load_depth(Path(f), args.key) for f in args.frames] or [synthetic_frame(rng) for _ in range(3)]
+
+    methods = dict(METHODS)
+    methods["diffusion"] = lambda d: inpaint_diffusion(d, iterations=args.iterations)
+
+    times: Dict[str, List[float]] = {m: [] for m in methods}
+    errs: Dict[str, List[np.ndarray]] = {m: [] for m in methods}
+    unfilled: Dict[str, int] = {m: 0 for m in methods}
+    skipped = 0
+    for depth in frames:
+        valid = np.isfinite(depth)
+        if not valid.any():
+            # nothing to fill from: every method returns the frame unchanged
+            skipped += 1
+            continue
+        seeds = valid & (rng.random(depth.shape) < args.hide / 50.0)
+        hidden = ndimage.binary_dilation(seeds, iterations=3) & valid
+        probe = depth.copy()
+        probe[hidden] = np.nan
+
+        for name, fn in methods.items():
+            t0 = time.perf_counter()
+            filled = fn(probe)
+            times[name].append(time.perf_counter() - t0)
+            unfilled[name] += int(np.count_nonzero(~np.isfinite(filled)))
+            e = filled[hidden] - depth[hidden]
+            errs[name].append(e[np.isfinite(e)])
+
+    if skipped == len(frames):
+        raise SystemExit("No frame has a valid pixel")
+    base = np.mean(times["diffusion"])
+    print(f"frames: {len(frames) - skipped} (skipped {skipped} without valid pixels)  diffusion T={args.iterations}")
+    print(f"{'method':>10} {'ms/frame':>10} {'speedup':>8} {'MAE':>9} {'RMSE':>9} {'unfilled':>9}")
+    for name in methods:
+        e = np.concatenate(errs[name]) if errs[name] else np.zeros(0)
+        t = np.mean(times[name])
+        mae = float(np.mean(np.abs(e))) if e.size else float("nan")
+        rmse = float(np.sqrt(np.mean(e ** 2))) if e.size else float("nan")
+        print(f"{name:>10} {t * 1e3:>10.2f} {base / t:>8.1f} {mae:>9.4f} {rmse:>9.4f} {unfilled[name]:>9}")
+
+
+if __name__ == "__main__":
+    main()
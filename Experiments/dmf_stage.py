@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Allocation-free DMF fit/merge stage with a preallocated buffer pool.
+
+Per frame the stage crops to Omega_c, applies the consistency gate
+|D_ZED^c - D_L^c| <= tau, fits the ROI, merges it back and reapplies the
+invalid mask M, using only views and `out=` ufunc calls on buffers sized once
+from CameraInfo. Outputs are views into the pool and are overwritten by the
+next call to `process`.
+
+Run `python3 dmf_stage.py` for per-step latency and per-frame allocations.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Dict, Mapping, NamedTuple, Tuple
+
+import numpy as np
+
+from precision import PRECISIONS, get_precision
+
+
+class Crop(NamedTuple):
+    """
+    Omega_c margins (MORTAL_ROWS_TOP/BOTTOM, MORTAL_COLUMNS_LEFT/RIGHT).
+    """
+    top: int = 250
+    bottom: int = 320
+    left: int = 70
+    right: int = 10
+
+
+class DMFOutput(NamedTuple):
+    d_fit: np.ndarray      # D_fit(v,u), NaN where M = 1
+    anchors: np.ndarray    # gated D_L^c on the full grid, NaN elsewhere (PG anchors)
+    mask: np.ndarray       # M(v,u)
+
+
+STEPS = ("mask", "crop", "gate", "fit", "merge", "reapply")
+
+
+class DMFStage:
+    def __init__(self, width: int, height: int, *, crop: Crop = Crop(), tau: float = 50.0,
+                 precision: str = "float32"):
+        self.width, self.height = int(width), int(height)
+        self.crop = crop
+        self.tau = float(tau)
+        # outputs live in the storage dtype, the gate difference in the compute dtype
+        self.precision = get_precision(precision)
+        if crop.top + crop.bottom >= self.height or crop.left + crop.right >= self.width:
+            raise ValueError(f"Crop {tuple(crop)} leaves no ROI in a {self.width}x{self.height} image")
+        # Omega_c is handled as a full-width row band (contiguous memory, so no
+        # ufunc buffering) with the left/right margins cleared from the gate
+        self._band = slice(crop.top, self.height - crop.bottom)
+        self._right = self.width - crop.right
+        ch = self.height - crop.top - crop.bottom
+
+        # ---- buffer pool ----
+        shape = (self.height, self.width)
+        self.d_fit = np.empty(shape, dtype=self.precision.storage)
+        self.anchors = np.empty(shape, dtype=self.precision.storage)
+        self.mask = np.empty(shape, dtype=bool)
+        self._diff_c = np.empty((ch, self.width), dtype=self.precision.compute)
+        self._gate_c = np.empty((ch, self.width), dtype=bool)
+
+        self.timings: Dict[str, float] = {s: 0.0 for s in STEPS}
+        self.frames = 0
+
+    @property
+    def pool_bytes(self) -> int:
+        return sum(b.nbytes for b in (self.d_fit, self.anchors, self.mask, self._diff_c, self._gate_c))
+
+    @classmethod
+    def from_camera_info(cls, info: Mapping, **kwargs) -> "DMFStage":
+        return cls(info["width"], info["height"], **kwargs)
+
+    def process(self, zed_orig: np.ndarray, zed: np.ndarray, lidar: np.ndarray, *, timed: bool = False) -> DMFOutput:
+        """
+        zed_orig: raw D_ZED^orig, zed: inpainted D_ZED, lidar: projected D_L.
+        """
+        clock = time.perf_counter if timed else None
+        t = clock() if clock else 0.0
+
+        def tick(step: str) -> None:
+            nonlocal t
+            if clock:
+                now = clock()
+                self.timings[step] += now - t
+                t = now
+
+        # M(v,u) = not finite(D_ZED^orig)
+        np.isfinite(zed_orig, out=self.mask)
+        np.logical_not(self.mask, out=self.mask)
+        tick("mask")
+
+        zc = zed[self._band]
+        lc = lidar[self._band]
+        fit_c = self.d_fit[self._band]
+        anc_c = self.anchors[self._band]
+        tick("crop")
+
+        # NaN differences compare False, so pixels without LiDAR never pass
+        np.subtract(zc, lc, out=self._diff_c)
+        np.abs(self._diff_c, out=self._diff_c)
+        np.less_equal(self._diff_c, self.tau, out=self._gate_c)
+        self._gate_c[:, :self.crop.left] = False
+        self._gate_c[:, self._right:] = False
+        tick("gate")
+
+        self.anchors.fill(np.nan)
+        np.copyto(anc_c, lc, where=self._gate_c)
+        np.copyto(self.d_fit, zed)
+        tick("fit")
+
+        # fit_c is a view into d_fit, so writing the ROI is the merge
+        np.copyto(fit_c, lc, where=self._gate_c)
+        tick("merge")
+
+        np.putmask(self.d_fit, self.mask, np.nan)
+        tick("reapply")
+
+        self.frames += 1
+        return DMFOutput(self.d_fit, self.anchors, self.mask)
+
+
+def synthetic_inputs(width: int, height: int, tau: float = 50.0, seed: int = 0,
+                     outliers: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    ZED depth of 2-10 m, LiDAR on 5% of the pixels with 2 cm noise, and a
+    fraction of LiDAR returns off by 1.5-3 tau (returns from behind an edge)
+    that the consistency gate must reject.
+    """
+    rng = np.random.default_rng(seed)
+    zed = (2.0 + 8.0 * rng.random((height, width))).astype(np.float32)
+    zed_orig = zed.copy()
+    zed_orig[rng.random((height, width)) < 0.1] = np.nan
+    lidar = np.full((height, width), np.nan, dtype=np.float32)
+    hit = rng.random((height, width)) < 0.05
+    err = rng.normal(0.0, 0.02, hit.sum())
+    far = rng.random(hit.sum()) < outliers
+    err[far] = tau * rng.uniform(1.5, 3.0, far.sum())
+    lidar[hit] = zed[hit] + err.astype(np.float32)
+    return zed_orig, zed, lidar
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the pooled DMF stage (latency per step, allocations per frame).")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--crop", nargs=4, type=int, default=list(Crop()), metavar=("TOP", "BOTTOM", "LEFT", "RIGHT"))
+    ap.add_argument("--tau", type=float, default=50.0, help="ZED_VLP_DIFF_MAX")
+    ap.add_argument("--frames", type=int, default=200)
+    ap.add_argument("--precision", default="float32", choices=sorted(PRECISIONS))
+    args = ap.parse_args()
+
+    zed_orig, zed, lidar = synthetic_inputs(args.width, args.height, tau=args.tau)
+    stage = DMFStage(args.width, args.height, crop=Crop(*args.crop), tau=args.tau, precision=args.precision)
+    out = stage.process(zed_orig, zed, lidar)
+    hits = np.count_nonzero(np.isfinite(lidar[stage._band, stage.crop.left:stage._right]))
+    gated = np.count_nonzero(np.isfinite(out.anchors))
+    stage.timings = {s: 0.0 for s in STEPS}
+
+    tracemalloc.start()
+    peak_total = 0
+    for _ in range(args.frames):
+        tracemalloc.reset_peak()
+        cur0, _ = tracemalloc.get_traced_memory()
+        stage.process(zed_orig, zed, lidar, timed=True)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - cur0
+    tracemalloc.stop()
+
+    frame_bytes = args.width * args.height * 4
+    print(f"image: {args.width}x{args.height}  frames: {args.frames}  pool: {stage.pool_bytes / 2**20:.1f} MiB")
+    print(f"gate: {gated}/{hits} LiDAR pixels in Omega_c kept (tau={args.tau:g})")
+    for step in STEPS:
+        print(f"  {step:>8}: {stage.timings[step] / args.frames * 1e3:7.3f} ms")
+    total = sum(stage.timings.values()) / args.frames
+    print(f"  {'total':>8}: {total * 1e3:7.3f} ms")
+    print(f"allocated per frame: {peak_total / args.frames:.0f} B "
+          f"({peak_total / args.frames / frame_bytes * 100:.3f}% of one float32 frame)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Time- and distance-resolved APE/RPE error profiles from evo result zips.
+
+For every <I>_<H> folder the per-pose (APE) or per-pair (RPE) error array is
+placed on two axes stored in the same zip, seconds_from_start and
+distances_from_start, and summarized in sliding windows centred on a common
+grid (so all configurations and the ZED baseline line up):
+
+  mean, rmse   prefix sums of e and e^2: one searchsorted for the window
+               bounds, then (S[hi] - S[lo]) / n, O(N + G)
+  max          np.maximum.reduceat over the non-empty [lo, hi) windows, no
+               extra table: O(N + sum of window lengths), O(N) memory
+
+  python3 error_profiles.py --root . --pattern pg_ape_se3 pg_rpe_50m_se3 \\
+      --time-window 10 --dist-window 50 --out traj_plots/profiles
+
+Writes arrays/<I>_<H>_<pattern>.npz (float32 profiles for PG and ZED) and
+aligned plots: all configs, by_iter/ (histories per I) and by_hist/ (I per H),
+next to the agg_plot.sh trajectory overlays. matplotlib is imported for the
+first plot only, so --no-plots runs without it.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from analyze import infer_IH_from_path
+
+
+AXES = {"time": "seconds_from_start", "distance": "distances_from_start"}
+AXIS_UNITS = {"time": "s", "distance": "m"}
+STATS = ("mean", "rmse", "max")
+
+
+def _pyplot():
+    """
+    matplotlib (pyplot, cm), imported on the first plot.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
+    return plt, cm
+
+
+def load_axes(zip_path: Path) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    (error_array, {axis: coordinate}) from an evo result zip; axes that are
+    missing from the zip are skipped (time falls back to timestamps).
+    """
+    with zipfile.ZipFile(zip_path) as z:
+        names = set(z.namelist())
+        load = lambda k: np.load(io.BytesIO(z.read(k))).astype(float)
+        err = load("error_array.npy")
+        coords: Dict[str, np.ndarray] = {}
+        for axis, key in AXES.items():
+            if f"{key}.npy" in names:
+                coords[axis] = load(f"{key}.npy")
+        if "time" not in coords and "timestamps.npy" in names:
+            t = load("timestamps.npy")
+            coords["time"] = t - t[0] if t.size else t
+    # RPE arrays can be one longer than the error array (pair end points)
+    return err, {a: x[:err.size] for a, x in coords.items() if x.size >= err.size}
+
+
+def window_max(x: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """
+    max of x over the half-open index ranges [lo, hi), NaN for empty ones.
+    One reduceat over the interleaved (lo, hi) bounds of the non-empty ranges;
+    x gets a -inf sentinel so hi == x.size is a valid index.
+    """
+    out = np.full(lo.shape, np.nan)
+    ok = hi > lo
+    if ok.any():
+        bounds = np.stack([lo[ok], hi[ok]], axis=1).ravel()
+        out[ok] = np.maximum.reduceat(np.append(x, -np.inf), bounds)[::2]
+    return out
+
+
+def window_stats(x: np.ndarray, e: np.ndarray, centers: np.ndarray, width: float) -> Dict[str, np.ndarray]:
+    """
+    Sliding-window count/mean/rmse/max of e over coordinate x at the given centers.
+    """
+    if e.size == 0:
+        nan = np.full(centers.shape, np.nan)
+        return {"count": np.zeros(centers.shape, dtype=int), "mean": nan, "rmse": nan.copy(), "max": nan.copy()}
+    if np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind="stable")
+        x, e = x[order], e[order]
+    lo = np.searchsorted(x, centers - 0.5 * width, side="left")
+    hi = np.searchsorted(x, centers + 0.5 * width, side="left")
+    s1 = np.concatenate([[0.0], np.cumsum(e)])
+    s2 = np.concatenate([[0.0], np.cumsum(e * e)])
+    n = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (s1[hi] - s1[lo]) / n
+        rmse = np.sqrt(np.maximum(s2[hi] - s2[lo], 0.0) / n)
+    return {"count": n, "mean": mean, "rmse": rmse, "max": window_max(e, lo, hi)}
+
+
+def find_pairs(root: Path, pattern: str, baseline_pattern: str) -> Dict[Tuple[int, int], Tuple[Path, Optional[Path]]]:
+    """
+    {(I, H): (pg zip, baseline zip or None)} under <root>/<I>_<H>/outputs/.
+    """
+    out: Dict[Tuple[int, int], Tuple[Path, Optional[Path]]] = {}
+    for zp in sorted(root.glob(f"*_*/outputs/**/{pattern}.zip")):
+        try:
+            IH = infer_IH_from_path(zp)
+        except ValueError:
+            continue
+        if IH in out:
+            continue
+        zb = next(iter(sorted(zp.parent.glob(f"{baseline_pattern}.zip"))), None)
+        out[IH] = (zp, zb)
+    return out
+
+
+def plot_profiles(
+    profiles: Dict[Tuple[int, int], Dict[str, np.ndarray]],
+    baseline: Optional[Dict[str, np.ndarray]],
+    *,
+    axis: str,
+    centers: np.ndarray,
+    title: str,
+    outpath: Path,
+    cmap_name: str = "viridis",
+) -> None:
+    plt, cm = _pyplot()
+    fig, axs = plt.subplots(len(STATS), 1, figsize=(9.0, 7.5), sharex=True)
+    cmap = getattr(cm, cmap_name, cm.viridis)
+    keys = sorted(profiles)
+    for i, IH in enumerate(keys):
+        color = cmap(i / max(len(keys) - 1, 1))
+        for ax, stat in zip(axs, STATS):
+            ax.plot(centers, profiles[IH][stat], color=color, linewidth=1.0, label=f"PG {IH[0]}_{IH[1]}")
+    if baseline is not None:
+        for ax, stat in zip(axs, STATS):
+            ax.plot(centers, baseline[stat], color="black", linestyle="--", linewidth=1.2, label="ZED")
+    for ax, stat in zip(axs, STATS):
+        ax.set_ylabel(stat)
+        ax.grid(True, alpha=0.3)
+    axs[0].set_title(title)
+    axs[0].legend(fontsize=7, ncol=4, loc="upper right")
+    axs[-1].set_xlabel(f"{axis} from start ({AXIS_UNITS[axis]})")
+    fig.tight_layout()
+    fig.savefig(outpath, dpi=200)
+    plt.close(fig)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Sliding-window APE/RPE profiles over time and distance per (I,H).")
+    ap.add_argument("--root", default=".", help="Experiment root with <I>_<H>/outputs/**/<pattern>.zip")
+    ap.add_argument("--pattern", nargs="+", required=True, help="PG patterns, e.g. pg_ape_se3 pg_rpe_50m_se3")
+    ap.add_argument("--baseline-pattern", nargs="+", default=None,
+                    help="Baseline patterns (default: pattern with pg_ -> zed_)")
+    ap.add_argument("--time-window", type=float, default=10.0, help="Window width in seconds")
+    ap.add_argument("--time-step", type=float, default=1.0, help="Grid spacing in seconds")
+    ap.add_argument("--dist-window", type=float, default=50.0, help="Window width in meters")
+    ap.add_argument("--dist-step", type=float, default=5.0, help="Grid spacing in meters")
+    ap.add_argument("--cmap", default="viridis", help="Colormap for the PG configurations")
+    ap.add_argument("--no-plots", action="store_true", help="Only write the profile arrays")
+    ap.add_argument("--out", default="traj_plots/profiles", help="Output directory")
+    args = ap.parse_args()
+
+    baselines = args.baseline_pattern or [p.replace("pg_", "zed_", 1) for p in args.pattern]
+    if len(baselines) != len(args.pattern):
+        ap.error("--baseline-pattern needs one entry per --pattern")
+    windows = {"time": (args.time_window, args.time_step), "distance": (args.dist_window, args.dist_step)}
+    out = Path(args.out)
+    for sub in ("arrays", "by_iter", "by_hist"):
+        (out / sub).mkdir(parents=True, exist_ok=True)
+
+    for pattern, base in zip(args.pattern, baselines):
+        pairs = find_pairs(Path(args.root), pattern, base)
+        if not pairs:
+            print(f"[skip] no {pattern}.zip under {args.root}")
+            continue
+        loaded = {IH: (load_axes(zp), load_axes(zb) if zb is not None else None) for IH, (zp, zb) in pairs.items()}
+        arrays: Dict[Tuple[int, int], Dict[str, np.ndarray]] = {IH: {} for IH in loaded}
+
+        for axis, (width, step) in windows.items():
+            spans = [c[axis][-1] for (_, c), _ in loaded.values() if axis in c and c[axis].size]
+            if not spans:
+                continue
+            # one grid for every configuration: profiles line up sample by sample
+            centers = np.arange(0.5 * width, max(spans) - 0.5 * width + step, step)
+            prof: Dict[Tuple[int, int], Dict[str, np.ndarray]] = {}
+            base_prof: Optional[Dict[str, np.ndarray]] = None
+            for IH, ((e, c), zed) in loaded.items():
+                if axis not in c:
+                    continue
+                prof[IH] = window_stats(c[axis], e, centers, width)
+                arrays[IH][f"{axis}_centers"] = centers
+                arrays[IH].update({f"{axis}_{k}": v for k, v in prof[IH].items()})
+                if zed is not None and axis in zed[1]:
+                    zed_prof = window_stats(zed[1][axis], zed[0], centers, width)
+                    base_prof = base_prof or zed_prof
+                    arrays[IH].update({f"zed_{axis}_{k}": v for k, v in zed_prof.items()})
+
+            if args.no_plots or not prof:
+                continue
+            label = f"{pattern} :: {axis} window {width:g} {AXIS_UNITS[axis]}"
+            plot_profiles(prof, base_prof, axis=axis, centers=centers, title=label,
+                          outpath=out / f"all_{pattern}_{axis}.png", cmap_name=args.cmap)
+            for I in sorted({k[0] for k in prof}):
+                plot_profiles({k: v for k, v in prof.items() if k[0] == I}, base_prof, axis=axis, centers=centers,
+                              title=f"I={I} :: {label}", outpath=out / "by_iter" / f"iter_{I}_{pattern}_{axis}.png",
+                              cmap_name=args.cmap)
+            for H in sorted({k[1] for k in prof}):
+                plot_profiles({k: v for k, v in prof.items() if k[1] == H}, base_prof, axis=axis, centers=centers,
+                              title=f"H={H} :: {label}", outpath=out / "by_hist" / f"hist_{H}_{pattern}_{axis}.png",
+                              cmap_name=args.cmap)
+
+        for (I, H), a in arrays.items():
+            np.savez_compressed(out / "arrays" / f"{I}_{H}_{pattern}.npz",
+                                **{k: v.astype(np.int32 if k.endswith("_count") else np.float32) for k, v in a.items()})
+        print(f"[OK] {pattern}: {len(loaded)} configurations -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for evo computations (used by evo.sh).
+
+  evo_cache.py run -- evo_rpe tum ../gt.tum ../pg.tum -r trans_part -d 50 -u m --save_results pg_rpe_50m_raw.zip
+
+The cache key is a SHA-256 over the evo version, the tool name and its
+arguments, with every input file replaced by a hash of its contents (files
+larger than --max-hash-mib, i.e. bags, by path + size + mtime) and the output
+paths (--save_results / --save_plot) left out. So the same metric on the same
+trajectories is computed once, whichever (I,H) folder asks for it: the ZED vs
+GT baseline is evaluated once per sweep, and re-running a sweep after adding
+one configuration only computes that configuration. A per-key lock makes
+parallel evo.sh runs wait for each other instead of duplicating work.
+
+On a hit the stored outputs are restored under the requested names:
+  --save_results   the result zip (its stats.json is also kept as a summary row)
+  --save_plot      every <base>_<figure><ext> file evo wrote
+  neither          files the command created in the working directory (e.g. --save_as_tum)
+
+Cache layout (default $EVO_CACHE_DIR or ./.evo_cache):
+  objects/<k[:2]>/<k>.zip   stored outputs
+  rows/<k>.json             command, input hashes and stats of result zips
+  locks/<k>.lock
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import fcntl
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+OUTPUT_FLAGS = ("--save_results", "--save_plot")
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def evo_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("evo")
+    except Exception:
+        return "unknown"
+
+
+def file_digest(path: str, max_bytes: int) -> str:
+    st = os.stat(path)
+    memo = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    if memo in _hash_memo:
+        return _hash_memo[memo]
+    if st.st_size > max_bytes:
+        digest = "stat:" + hashlib.sha256(repr(memo).encode()).hexdigest()
+    else:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+        digest = "sha256:" + h.hexdigest()
+    _hash_memo[memo] = digest
+    return digest
+
+
+def split_outputs(argv: Sequence[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Remove --save_results/--save_plot (and values) from argv; return (rest, outputs).
+    """
+    rest: List[str] = []
+    outputs: Dict[str, str] = {}
+    it = iter(argv)
+    for tok in it:
+        if tok in OUTPUT_FLAGS:
+            outputs[tok] = next(it)
+        else:
+            rest.append(tok)
+    return rest, outputs
+
+
+def cache_key(argv: Sequence[str], max_bytes: int) -> Tuple[str, Dict[str, str]]:
+    """
+    (key, {input path: digest}) for an evo command line.
+    """
+    rest, _ = split_outputs(argv)
+    inputs: Dict[str, str] = {}
+    parts = [evo_version()]
+    for tok in rest:
+        if os.path.isfile(tok):
+            inputs[tok] = file_digest(tok, max_bytes)
+            parts.append(inputs[tok])
+        else:
+            parts.append(tok)
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest(), inputs
+
+
+def _snapshot(root: Path) -> Dict[str, Tuple[int, int]]:
+    return {p.name: (p.stat().st_mtime_ns, p.stat().st_size) for p in root.iterdir() if p.is_file()}
+
+
+def _plot_files(base: str, t0: float) -> List[Path]:
+    stem, ext = os.path.splitext(base)
+    d = Path(stem).parent
+    prefix = Path(stem).name + "_"
+    return sorted(p for p in d.glob(f"{prefix}*{ext}") if p.stat().st_mtime >= t0)
+
+
+class EvoCache:
+    def __init__(self, root: Path, max_hash_mib: float = 64.0):
+        self.root = Path(root)
+        self.max_bytes = int(max_hash_mib * 2**20)
+        for sub in ("objects", "rows", "locks"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+
+    def _object(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / f"{key}.zip"
+
+    def run(self, argv: Sequence[str]) -> bool:
+        """
+        Restore the outputs of argv from the cache, or run it and store them.
+        Returns True on a cache hit.
+        """
+        key, inputs = cache_key(argv, self.max_bytes)
+        _, outputs = split_outputs(argv)
+        with open(self.root / "locks" / f"{key}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            obj = self._object(key)
+            if obj.exists():
+                self._restore(obj, outputs)
+                print(f"[cache] hit  {key[:12]} {' '.join(argv[:1])}", file=sys.stderr)
+                return True
+            self._compute(key, argv, inputs, outputs, obj)
+            print(f"[cache] miss {key[:12]} {' '.join(argv[:1])}", file=sys.stderr)
+            return False
+
+    def _compute(self, key: str, argv: Sequence[str], inputs: Dict[str, str],
+                 outputs: Dict[str, str], obj: Path) -> None:
+        cwd = Path.cwd()
+        before = _snapshot(cwd)
+        t0 = time.time() - 1.0  # mtime granularity
+        subprocess.run(list(argv), check=True)
+
+        buf = io.BytesIO()
+        stats = None
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as z:
+            if "--save_results" in outputs:
+                res = outputs["--save_results"]
+                z.write(res, "results")
+                with zipfile.ZipFile(res) as rz:
+                    if "stats.json" in rz.namelist():
+                        stats = json.loads(rz.read("stats.json"))
+            if "--save_plot" in outputs:
+                base = outputs["--save_plot"]
+                stem = os.path.splitext(base)[0]
+                for p in _plot_files(base, t0):
+                    z.write(p, "plot/" + str(p)[len(stem):])
+            if not outputs:
+                for name, sig in _snapshot(cwd).items():
+                    if before.get(name) != sig:
+                        z.write(cwd / name, "cwd/" + name)
+
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = obj.with_suffix(".tmp")
+        tmp.write_bytes(buf.getvalue())
+        os.replace(tmp, obj)
+
+        row = {"key": key, "argv": list(argv), "inputs": inputs, "evo": evo_version(), "stats": stats}
+        (self.root / "rows" / f"{key}.json").write_text(json.dumps(row, indent=2), encoding="utf-8")
+
+    @staticmethod
+    def _restore(obj: Path, outputs: Dict[str, str]) -> None:
+        with zipfile.ZipFile(obj) as z:
+            for name in z.namelist():
+                if name == "results":
+                    dest = Path(outputs["--save_results"])
+                elif name.startswith("plot/"):
+                    dest = Path(os.path.splitext(outputs["--save_plot"])[0] + name[len("plot/"):])
+                else:
+                    dest = Path(name[len("cwd/"):])
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                dest.write_bytes(z.read(name))
+
+    def rows(self) -> List[dict]:
+        return [json.loads(p.read_text(encoding="utf-8")) for p in sorted((self.root / "rows").glob("*.json"))]
+
+
+def write_rows_csv(rows: List[dict], out: Path) -> int:
+    """
+    One line per cached result zip: command, input digests and evo stats.
+    """
+    stat_keys = sorted({k for r in rows if r.get("stats") for k in r["stats"]})
+    n = 0
+    with out.open("w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["key", "tool", "args", "inputs"] + stat_keys)
+        for r in rows:
+            if not r.get("stats"):
+                continue
+            rest, _ = split_outputs(r["argv"])
+            w.writerow([r["key"], rest[0], " ".join(rest[1:]), " ".join(r["inputs"].values())]
+                       + [r["stats"].get(k, "") for k in stat_keys])
+            n += 1
+    return n
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Content-addressed cache for evo_ape / evo_rpe / evo_traj runs.")
+    ap.add_argument("--cache", default=os.environ.get("EVO_CACHE_DIR", ".evo_cache"), help="Cache folder")
+    ap.add_argument("--max-hash-mib", type=float, default=64.0,
+                    help="Inputs larger than this (bags) are keyed by path/size/mtime instead of contents")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="Run an evo command through the cache")
+    p_run.add_argument("command", nargs=argparse.REMAINDER, help="-- evo_... arguments")
+    p_rows = sub.add_parser("rows", help="Export the cached summary rows as CSV")
+    p_rows.add_argument("--out", default="evo_cache_rows.csv")
+    sub.add_parser("info", help="Print cache size")
+    args = ap.parse_args(argv)
+
+    cache = EvoCache(Path(args.cache), args.max_hash_mib)
+    if args.cmd == "run":
+        command = args.command[1:] if args.command[:1] == ["--"] else args.command
+        if not command:
+            ap.error("run needs a command after --")
+        cache.run(command)
+    elif args.cmd == "rows":
+        n = write_rows_csv(cache.rows(), Path(args.out))
+        print(f"[OK] {n} rows -> {args.out}")
+    else:
+        objs = list((cache.root / "objects").glob("*/*.zip"))
+        size = sum(p.stat().st_size for p in objs)
+        print(f"{cache.root}: {len(objs)} entries, {size / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
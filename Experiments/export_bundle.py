@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Export the results as one data file plus a static HTML viewer.
+
+Instead of a PNG per (variant, pattern, metric, plot type), the whole results
+cube M[variant, pattern, metric, I, H] is read from the metrics CSVs once and
+written as float32 arrays, together with the effect decomposition and
+distance-decimated trajectories, into bundle.js. index.html (a copy of
+bundle_viewer.html) loads it and draws heatmaps, slices, a rotatable surface,
+effects and trajectories in the browser; it opens from the file system
+without a web server.
+
+  python3 export_bundle.py --root . --out out/bundle
+  xdg-open out/bundle/index.html
+
+Effects per (variant, pattern, metric), on the I x H grid:
+  C(I,H) = (M(0,1) - M(I,H)) / M(0,1), C_I = mean_H C, C_H = mean_I C
+  Gamma(I,H) = M(I,H) - M(I,1) - M(0,H) + M(0,1)   (as analyze.py --gamma)
+  two-way split M = mu + a_I + b_H + r_IH with the sum-of-squares share of
+  I, H and the interaction r
+
+The PNG outputs of run_analyze.sh are unchanged and still feed the appendix.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import csv
+import json
+import re
+import shutil
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from analyze import METRICS, infer_IH_from_path
+
+
+VIEWER = Path(__file__).with_name("bundle_viewer.html")
+TRAJ_GLOBS = {"gt": "gps*_odometry.tum", "zed": "zed*_odom.tum", "pg": "pg*_odom.tum"}
+
+
+def read_metrics_csv(path: Path) -> Dict[str, Dict[str, float]]:
+    """
+    {pattern: {metric: value}} from an evo_res table (first column: result file name).
+    """
+    out: Dict[str, Dict[str, float]] = {}
+    with path.open(newline="", encoding="utf-8") as fh:
+        rows = list(csv.reader(fh))
+    if not rows:
+        return out
+    header = rows[0]
+    cols = {m: header.index(m) for m in METRICS if m in header}
+    for row in rows[1:]:
+        if not row:
+            continue
+        name = re.sub(r"\.zip$", "", Path(row[0]).name)
+        vals = {}
+        for m, j in cols.items():
+            try:
+                vals[m] = float(row[j])
+            except (ValueError, IndexError):
+                pass
+        out[name] = vals
+    return out
+
+
+def b64(a: np.ndarray) -> str:
+    """
+    Little-endian float32 bytes as base64 (decoded into a Float32Array by the viewer).
+    """
+    return base64.b64encode(np.ascontiguousarray(a, dtype="<f4").tobytes()).decode("ascii")
+
+
+def build_cube(files: List[Path]) -> Tuple[Dict[str, List], np.ndarray]:
+    """
+    axes {variant, pattern, metric, I, H} and the float32 cube (NaN = missing);
+    patterns lose their variant suffix (pg_ape_se3 in metrics_aligned_se3 -> pg_ape).
+    """
+    cells: Dict[Tuple[str, str, str, int, int], float] = {}
+    for f in files:
+        try:
+            I, H = infer_IH_from_path(f)
+        except ValueError:
+            continue
+        variant = f.stem
+        # metrics_aligned_se3.csv holds *_se3 rows: strip the suffix so patterns are shared by variants
+        suffix = "_" + variant.rsplit("_", 1)[-1]
+        for pattern, vals in read_metrics_csv(f).items():
+            if pattern.endswith(suffix):
+                pattern = pattern[:-len(suffix)]
+            for m, v in vals.items():
+                cells[(variant, pattern, m, I, H)] = v
+    axes = {
+        "variant": sorted({k[0] for k in cells}),
+        "pattern": sorted({k[1] for k in cells}),
+        "metric": [m for m in METRICS if any(k[2] == m for k in cells)],
+        "I": sorted({k[3] for k in cells}),
+        "H": sorted({k[4] for k in cells}),
+    }
+    index = {name: {v: i for i, v in enumerate(vals)} for name, vals in axes.items()}
+    cube = np.full([len(v) for v in axes.values()], np.nan, dtype=np.float32)
+    for key, v in cells.items():
+        cube[tuple(index[name][x] for name, x in zip(axes, key))] = v
+    return axes, cube
+
+
+def effects(cube: np.ndarray, I_vals: List[int], H_vals: List[int]) -> Dict[str, np.ndarray]:
+    """
+    Effect decomposition over the last two (I, H) axes of the cube, vectorized over the rest.
+    """
+    M = cube.astype(np.float64)
+    out: Dict[str, np.ndarray] = {}
+    # all-NaN slices (metric missing for a variant) stay NaN
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mu = np.nanmean(M, axis=(-2, -1), keepdims=True)
+        a = np.nanmean(M, axis=-1, keepdims=True) - mu
+        b = np.nanmean(M, axis=-2, keepdims=True) - mu
+        r = M - mu - a - b
+        valid = np.isfinite(M)
+        ss_i = np.nansum(np.where(valid, a, np.nan) ** 2, axis=(-2, -1))
+        ss_h = np.nansum(np.where(valid, b, np.nan) ** 2, axis=(-2, -1))
+        ss_r = np.nansum(r ** 2, axis=(-2, -1))
+        total = ss_i + ss_h + ss_r
+        out["share"] = np.stack([ss_i, ss_h, ss_r], axis=-1) / total[..., None]
+        out["interaction"] = r
+        if 0 in I_vals and 1 in H_vals:
+            i0, h1 = I_vals.index(0), H_vals.index(1)
+            M01 = M[..., i0:i0 + 1, h1:h1 + 1]
+            C = (M01 - M) / M01
+            out["C"] = C
+            out["C_I"] = np.nanmean(C, axis=-1)
+            out["C_H"] = np.nanmean(C, axis=-2)
+            out["gamma"] = M - M[..., :, h1:h1 + 1] - M[..., i0:i0 + 1, :] + M01
+    return {k: v.astype(np.float32) for k, v in out.items()}
+
+
+def load_tum_xyz(path: Path) -> np.ndarray:
+    """
+    (N, 3) positions of a TUM file (timestamp x y z qx qy qz qw).
+    """
+    data = np.loadtxt(path, comments="#", usecols=(1, 2, 3), ndmin=2)
+    return data.astype(np.float64)
+
+
+def decimate(xyz: np.ndarray, step: float, max_points: int) -> np.ndarray:
+    """
+    First pose of every `step` meters of travelled distance (always keeps the last), capped at max_points.
+    """
+    if xyz.shape[0] < 3:
+        return xyz
+    s = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(xyz, axis=0), axis=1))])
+    step = max(step, s[-1] / max(max_points - 1, 1))
+    _, keep = np.unique(np.floor(s / step), return_index=True)
+    keep = np.union1d(keep, [xyz.shape[0] - 1])
+    return xyz[keep]
+
+
+def collect_trajectories(root: Path, step: float, max_points: int) -> Dict[str, Dict[str, str]]:
+    """
+    {"gt"/"zed": {"xyz": b64, "n": N}, "pg": {"<I>_<H>": {...}}} from <I>_<H>/outputs/**/*.tum.
+    """
+    out: Dict[str, Dict] = {"pg": {}}
+    for exp in sorted(p for p in root.glob("*_*") if p.is_dir()):
+        try:
+            I, H = infer_IH_from_path(exp / "outputs")
+        except ValueError:
+            continue
+        for kind, pattern in TRAJ_GLOBS.items():
+            hits = sorted((exp / "outputs").glob(f"**/{pattern}"))
+            if not hits or (kind != "pg" and kind in out):
+                continue
+            xyz = decimate(load_tum_xyz(hits[0]), step, max_points)
+            entry = {"xyz": b64(xyz), "n": int(xyz.shape[0])}
+            if kind == "pg":
+                out["pg"][f"{I}_{H}"] = entry
+            else:
+                out[kind] = entry
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Write the metrics cube, effects and trajectories as one bundle + HTML viewer.")
+    ap.add_argument("--root", default=".", help="Experiment root with <I>_<H>/outputs/metrics_*.csv")
+    ap.add_argument("--out", default="out/bundle", help="Output directory (bundle.js + index.html)")
+    ap.add_argument("--traj-step", type=float, default=0.5, help="Trajectory decimation step in meters")
+    ap.add_argument("--traj-max-points", type=int, default=4000, help="Upper bound of points per trajectory")
+    ap.add_argument("--no-trajectories", action="store_true", help="Skip the TUM trajectories")
+    ap.add_argument("--title", default="PG (I,H) results")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    root = Path(args.root)
+    files = sorted(root.glob("*_*/outputs/metrics_*.csv"))
+    if not files:
+        raise SystemExit(f"No <I>_<H>/outputs/metrics_*.csv under {root}")
+    axes, cube = build_cube(files)
+    eff = effects(cube, axes["I"], axes["H"])
+
+    bundle = {
+        "title": args.title,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "axes": axes,
+        "shape": list(cube.shape),
+        "cube": b64(cube),
+        "effects": {k: {"shape": list(v.shape), "data": b64(v)} for k, v in eff.items()},
+        "trajectories": None if args.no_trajectories else collect_trajectories(
+            root, args.traj_step, args.traj_max_points),
+    }
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    data = out / "bundle.js"
+    data.write_text("window.BUNDLE = " + json.dumps(bundle, separators=(",", ":")) + ";\n", encoding="utf-8")
+    shutil.copyfile(VIEWER, out / "index.html")
+
+    n_cells = int(np.isfinite(cube).sum())
+    n_traj = 0 if bundle["trajectories"] is None else len(bundle["trajectories"]["pg"])
+    print(f"cube {' x '.join(str(n) for n in cube.shape)} ({n_cells} values) from {len(files)} CSVs, "
+          f"{n_traj} PG trajectories")
+    print(f"[OK] {data} ({data.stat().st_size / 2**20:.2f} MiB) + index.html in {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Chunked, memory-mappable frame store for offline replays and sweeps.
+
+A store is a folder:
+  meta.json               width, height, depth dtype, chunk size, camera_info, chunk table
+  stamps.npy              (N,) float64 frame timestamps [s], non-decreasing
+  odom.npy                (N, 3) float64 odometry positions
+  chunk_<k>.depth.npy     (n, H, W) float32 or float16
+  chunk_<k>.points.npy    (P, 3) float32, all clouds of the chunk back to back
+  chunk_<k>.offsets.npy   (n + 1,) int64, cloud i is points[offsets[i]:offsets[i + 1]]
+  chunk_<k>.t.npy         (P,) float32 per-point time offsets [s] from the frame stamp,
+                          indexed like points (only if meta "point_times")
+or, with --compress, one chunk_<k>.npz (depth, points, offsets[, t]) per chunk.
+A store has point times for every frame or for none.
+
+Uncompressed chunks are opened with np.load(mmap_mode="r"), so frames are
+zero-copy views into the page cache and parallel workers share it. Compressed
+chunks are inflated once and kept while frames of the same chunk are read.
+
+Convert a replay dataset (camera_info.json + frames/*.npz) or a ROS1 bag
+(needs the optional `rosbags` package):
+  python3 framestore.py --dataset dataset/ --out store/ --float16
+  python3 framestore.py --bag run.bag --out store/
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+DEPTH_DTYPES = ("float32", "float16")
+
+BAG_TOPICS = {
+    "depth": "/zed2i/zed_node/depth/depth_registered",
+    "camera_info": "/zed2i/zed_node/depth/camera_info",
+    "points": "/velodyne_points",
+    "odom": "/jackal_velocity_controller/odom",
+}
+
+
+class FrameStoreWriter:
+    """
+    Appends frames and flushes them chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        width: int,
+        height: int,
+        *,
+        chunk_size: int = 256,
+        depth_dtype: str = "float32",
+        compress: bool = False,
+        camera_info: Optional[Mapping] = None,
+    ):
+        if depth_dtype not in DEPTH_DTYPES:
+            raise ValueError(f"Unknown depth dtype '{depth_dtype}', expected one of {DEPTH_DTYPES}")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.width, self.height = int(width), int(height)
+        self.chunk_size = int(chunk_size)
+        self.depth_dtype = depth_dtype
+        self.compress = compress
+        self.camera_info = dict(camera_info) if camera_info else None
+
+        self._depth = np.empty((self.chunk_size, self.height, self.width), dtype=depth_dtype)
+        self._clouds: List[np.ndarray] = []
+        self._times: List[np.ndarray] = []
+        self._point_times: Optional[bool] = None  # fixed by the first frame
+        self._stamps: List[float] = []
+        self._odom: List[np.ndarray] = []
+        self._chunks: List[Dict[str, Any]] = []
+        self._n = 0
+
+    def append(self, stamp: float, depth: np.ndarray, points: np.ndarray, position: np.ndarray,
+               t: Optional[np.ndarray] = None) -> None:
+        """
+        t: optional per-point time offsets [s] from stamp (for deskewing).
+        """
+        if depth.shape != (self.height, self.width):
+            raise ValueError(f"Depth shape {depth.shape} does not match store {self.height}x{self.width}")
+        if self._point_times is None:
+            self._point_times = t is not None
+        elif self._point_times != (t is not None):
+            raise ValueError("Per-point times must be given for every frame of a store or for none")
+        if t is not None and np.shape(t) != (points.shape[0],):
+            raise ValueError(f"{np.shape(t)} point times for {points.shape[0]} points")
+        # time lookups (index_range) binary-search the stamps
+        if self._stamps and stamp < self._stamps[-1]:
+            raise ValueError(f"Stamp {stamp} is older than the previous frame ({self._stamps[-1]}); "
+                             "append frames in time order")
+        i = len(self._clouds)
+        self._depth[i] = depth
+        self._clouds.append(np.asarray(points[:, :3], dtype=np.float32))
+        if t is not None:
+            self._times.append(np.asarray(t, dtype=np.float32))
+        self._stamps.append(float(stamp))
+        self._odom.append(np.asarray(position, dtype=np.float64)[:3])
+        self._n += 1
+        if len(self._clouds) == self.chunk_size:
+            self._flush()
+
+    @property
+    def n_frames(self) -> int:
+        return self._n
+
+    @property
+    def last_stamp(self) -> Optional[float]:
+        return self._stamps[-1] if self._stamps else None
+
+    def _flush(self) -> None:
+        n = len(self._clouds)
+        if n == 0:
+            return
+        k = len(self._chunks)
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([c.shape[0] for c in self._clouds], out=offsets[1:])
+        points = np.concatenate(self._clouds) if offsets[-1] else np.empty((0, 3), dtype=np.float32)
+        depth = self._depth[:n]
+        parts = {"depth": depth, "points": points, "offsets": offsets}
+        if self._point_times:
+            parts["t"] = np.concatenate(self._times) if offsets[-1] else np.empty(0, dtype=np.float32)
+
+        stem = f"chunk_{k:05d}"
+        if self.compress:
+            np.savez_compressed(self.root / f"{stem}.npz", **parts)
+        else:
+            for part, a in parts.items():
+                np.save(self.root / f"{stem}.{part}.npy", a)
+        self._chunks.append({"stem": stem, "first": self._n - n, "count": n})
+        self._clouds.clear()
+        self._times.clear()
+
+    def close(self) -> None:
+        self._flush()
+        np.save(self.root / "stamps.npy", np.asarray(self._stamps, dtype=np.float64))
+        np.save(self.root / "odom.npy", np.asarray(self._odom, dtype=np.float64).reshape(-1, 3))
+        meta = {
+            "version": 1,
+            "width": self.width,
+            "height": self.height,
+            "depth_dtype": self.depth_dtype,
+            "chunk_size": self.chunk_size,
+            "compress": self.compress,
+            "point_times": bool(self._point_times),
+            "n_frames": self._n,
+            "camera_info": self.camera_info,
+            "chunks": self._chunks,
+        }
+        (self.root / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    def __enter__(self) -> "FrameStoreWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if exc[0] is None:
+            self.close()
+
+
+class FrameStore:
+    """
+    Read side: random access by index, ranges by index or time.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.meta = json.loads((self.root / "meta.json").read_text(encoding="utf-8"))
+        self.width = self.meta["width"]
+        self.height = self.meta["height"]
+        self.camera_info = self.meta.get("camera_info")
+        # stores written before per-point times were kept have no entry
+        self.point_times = bool(self.meta.get("point_times", False))
+        self.stamps = np.load(self.root / "stamps.npy", mmap_mode="r")
+        self.odom = np.load(self.root / "odom.npy", mmap_mode="r")
+        if np.any(np.diff(self.stamps) < 0):
+            raise ValueError(f"{self.root}: stamps.npy is not sorted; re-convert the store")
+        self._first = np.array([c["first"] for c in self.meta["chunks"]], dtype=np.int64)
+        self._open: Dict[int, Tuple[np.ndarray, ...]] = {}
+
+    def __len__(self) -> int:
+        return self.meta["n_frames"]
+
+    def _chunk(self, k: int) -> Tuple[np.ndarray, ...]:
+        """
+        (depth, points, offsets[, t]) of chunk k.
+        """
+        arrays = self._open.get(k)
+        if arrays is None:
+            stem = self.meta["chunks"][k]["stem"]
+            parts = ("depth", "points", "offsets", "t") if self.point_times else ("depth", "points", "offsets")
+            if self.meta["compress"]:
+                # keep only the current compressed chunk inflated
+                self._open.clear()
+                with np.load(self.root / f"{stem}.npz") as z:
+                    arrays = tuple(z[part] for part in parts)
+            else:
+                arrays = tuple(np.load(self.root / f"{stem}.{part}.npy", mmap_mode="r") for part in parts)
+            self._open[k] = arrays
+        return arrays
+
+    def _locate(self, i: int) -> Tuple[int, int]:
+        if not 0 <= i < len(self):
+            raise IndexError(f"Frame {i} out of range [0, {len(self)})")
+        k = int(np.searchsorted(self._first, i, side="right")) - 1
+        return k, i - int(self._first[k])
+
+    def depth(self, i: int) -> np.ndarray:
+        k, j = self._locate(i)
+        return self._chunk(k)[0][j]
+
+    def points(self, i: int) -> np.ndarray:
+        k, j = self._locate(i)
+        _, pts, off = self._chunk(k)[:3]
+        return pts[off[j]:off[j + 1]]
+
+    def frame(self, i: int) -> Dict[str, Any]:
+        """
+        One frame as views into the store (read-only for memory-mapped chunks);
+        "t" holds the per-point time offsets if the store has them.
+        """
+        k, j = self._locate(i)
+        arrays = self._chunk(k)
+        depth, pts, off = arrays[:3]
+        frame = {
+            "name": f"{i:06d}",
+            "stamp": float(self.stamps[i]),
+            "zed_orig": depth[j],
+            "points": pts[off[j]:off[j + 1]],
+            "position": self.odom[i],
+        }
+        if self.point_times:
+            frame["t"] = arrays[3][off[j]:off[j + 1]]
+        return frame
+
+    def index_range(self, t0: Optional[float] = None, t1: Optional[float] = None) -> Tuple[int, int]:
+        """
+        [start, stop) of the frames with t0 <= stamp < t1.
+        """
+        start = 0 if t0 is None else int(np.searchsorted(self.stamps, t0, side="left"))
+        stop = len(self) if t1 is None else int(np.searchsorted(self.stamps, t1, side="left"))
+        return start, stop
+
+    def frames(self, start: int = 0, stop: Optional[int] = None, step: int = 1) -> Iterator[Dict[str, Any]]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(start, stop, step):
+            yield self.frame(i)
+
+    def frames_between(self, t0: Optional[float] = None, t1: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        return self.frames(*self.index_range(t0, t1))
+
+    def depth_block(self, start: int, stop: int) -> np.ndarray:
+        """
+        (n, H, W) depth for a range; a view if the range lies in one chunk, else
+        a copy. An empty range gives a (0, H, W) array.
+        """
+        if not 0 <= start <= stop <= len(self):
+            raise IndexError(f"Range [{start}, {stop}) out of [0, {len(self)}]")
+        if start == stop:
+            return np.empty((0, self.height, self.width), dtype=self.meta["depth_dtype"])
+        ks, js = self._locate(start)
+        ke, je = self._locate(stop - 1)
+        if ks == ke:
+            return self._chunk(ks)[0][js:je + 1]
+        return np.concatenate([self.depth(i)[None] for i in range(start, stop)])
+
+
+def is_frame_store(root: Path) -> bool:
+    return (Path(root) / "meta.json").is_file()
+
+
+# ---- converters ----
+
+def convert_dataset(src: Path, out: Path, **writer_kw) -> int:
+    """
+    Replay dataset (camera_info.json + frames/*.npz) -> frame store.
+    """
+    src = Path(src)
+    info = json.loads((src / "camera_info.json").read_text(encoding="utf-8"))
+    files = sorted((src / "frames").glob("*.npz"))
+    stamps = []
+    for f in files:
+        with np.load(f) as z:
+            stamps.append(float(z["stamp"]))
+    # file names need not follow time: write in stamp order
+    order = np.argsort(stamps, kind="stable")
+    with FrameStoreWriter(out, info["width"], info["height"], camera_info=info, **writer_kw) as w:
+        for f in (files[i] for i in order):
+            with np.load(f) as z:
+                w.append(float(z["stamp"]), z["zed_orig"], z["points"], z["position"],
+                         t=z["t"] if "t" in z.files else None)
+        return w.n_frames
+
+
+def _image_to_depth(msg) -> np.ndarray:
+    if msg.encoding == "32FC1":
+        dtype, scale = np.dtype("<f4" if not msg.is_bigendian else ">f4"), 1.0
+    elif msg.encoding == "16UC1":
+        dtype, scale = np.dtype("<u2" if not msg.is_bigendian else ">u2"), 1e-3
+    else:
+        raise ValueError(f"Unsupported depth encoding '{msg.encoding}'")
+    rows = np.frombuffer(msg.data, dtype=np.uint8).reshape(msg.height, msg.step)
+    d = rows[:, :msg.width * dtype.itemsize].copy().view(dtype).astype(np.float32)
+    if scale != 1.0:
+        d[d == 0] = np.nan
+        d *= scale
+    return d
+
+
+def _cloud_to_xyz(msg) -> np.ndarray:
+    fields = {f.name: f.offset for f in msg.fields}
+    endian = ">" if msg.is_bigendian else "<"
+    dtype = np.dtype({"names": ["x", "y", "z"], "formats": [endian + "f4"] * 3,
+                      "offsets": [fields["x"], fields["y"], fields["z"]], "itemsize": msg.point_step})
+    rec = np.frombuffer(msg.data, dtype=dtype, count=msg.width * msg.height)
+    return np.stack([rec["x"], rec["y"], rec["z"]], axis=1).astype(np.float32)
+
+
+def _cloud_times(msg) -> Optional[np.ndarray]:
+    """
+    Per-point time offsets [s] from the cloud stamp (velodyne "time" field), or None.
+    """
+    fields = {f.name: f for f in msg.fields}
+    f = fields.get("time", fields.get("t"))
+    if f is None or f.datatype != 7:  # PointField.FLOAT32
+        return None
+    dtype = np.dtype({"names": ["t"], "formats": [(">" if msg.is_bigendian else "<") + "f4"],
+                      "offsets": [f.offset], "itemsize": msg.point_step})
+    return np.frombuffer(msg.data, dtype=dtype, count=msg.width * msg.height)["t"].astype(np.float64)
+
+
+def _stamp(msg) -> float:
+    return msg.header.stamp.sec + msg.header.stamp.nanosec * 1e-9
+
+
+def convert_bag(bag: Path, out: Path, topics: Mapping[str, str] = BAG_TOPICS, **writer_kw) -> int:
+    """
+    ROS1 bag -> frame store. Every depth image becomes a frame, paired with the
+    latest LiDAR scan and odometry message received before it. A per-point
+    "time" field of the scan is kept as offsets from the depth stamp.
+    """
+    try:
+        from rosbags.highlevel import AnyReader
+    except ImportError as e:
+        raise SystemExit("Bag conversion needs the 'rosbags' package (pip install rosbags)") from e
+
+    writer: Optional[FrameStoreWriter] = None
+    info: Optional[Dict[str, Any]] = None
+    cloud: Optional[np.ndarray] = None
+    cloud_t: Optional[np.ndarray] = None
+    cloud_stamp = 0.0
+    position: Optional[np.ndarray] = None
+    skipped = 0
+    with AnyReader([Path(bag)]) as reader:
+        conns = [c for c in reader.connections if c.topic in topics.values()]
+        for conn, _, raw in reader.messages(connections=conns):
+            msg = reader.deserialize(raw, conn.msgtype)
+            if conn.topic == topics["camera_info"] and info is None:
+                K = msg.k if hasattr(msg, "k") else msg.K  # ROS2 / ROS1 field name
+                info = {"width": int(msg.width), "height": int(msg.height), "K": [float(k) for k in K]}
+            elif conn.topic == topics["points"]:
+                cloud, cloud_t, cloud_stamp = _cloud_to_xyz(msg), _cloud_times(msg), _stamp(msg)
+            elif conn.topic == topics["odom"]:
+                p = msg.pose.pose.position
+                position = np.array([p.x, p.y, p.z])
+            elif conn.topic == topics["depth"] and info is not None and cloud is not None and position is not None:
+                if writer is None:
+                    writer = FrameStoreWriter(out, info["width"], info["height"], camera_info=info, **writer_kw)
+                stamp = _stamp(msg)
+                if writer.last_stamp is not None and stamp < writer.last_stamp:
+                    # header stamps out of receive order: the store keeps time order
+                    skipped += 1
+                    continue
+                t = None if cloud_t is None else cloud_t + (cloud_stamp - stamp)
+                writer.append(stamp, _image_to_depth(msg), cloud, position, t=t)
+    if writer is None:
+        raise SystemExit(f"No synchronized depth/LiDAR/odometry frames found in {bag}")
+    if skipped:
+        print(f"[warn] skipped {skipped} depth frames with out-of-order header stamps")
+    writer.close()
+    return writer.n_frames
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Convert recorded frames into a chunked memory-mappable frame store.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--dataset", help="Replay dataset folder (camera_info.json + frames/*.npz)")
+    src.add_argument("--bag", help="ROS1 bag (needs the optional 'rosbags' package)")
+    ap.add_argument("--out", required=True, help="Output store folder")
+    ap.add_argument("--chunk-size", type=int, default=256, help="Frames per chunk")
+    ap.add_argument("--float16", action="store_true", help="Store depth as float16 (half the size)")
+    ap.add_argument("--compress", action="store_true", help="zlib-compress each chunk (no memory mapping)")
+    for name, topic in BAG_TOPICS.items():
+        ap.add_argument(f"--{name.replace('_', '-')}-topic", default=topic)
+    args = ap.parse_args()
+
+    kw = dict(chunk_size=args.chunk_size, depth_dtype="float16" if args.float16 else "float32",
+              compress=args.compress)
+    if args.dataset:
+        n = convert_dataset(Path(args.dataset), Path(args.out), **kw)
+    else:
+        topics = {name: getattr(args, f"{name}_topic") for name in BAG_TOPICS}
+        n = convert_bag(Path(args.bag), Path(args.out), topics, **kw)
+
+    size = sum(f.stat().st_size for f in Path(args.out).iterdir())
+    print(f"[OK] {n} frames -> {args.out} ({size / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
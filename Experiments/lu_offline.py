@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Offline LiDAR upsampling (LU) for several history sizes in one pass.
+
+Keeps a single window of the last max(H) transformed scans and exposes the
+cumulative cloud Y_k^cum for every requested H as nested views of the same
+buffer, so a history sweep such as {1, 2, 5, 10} reads and transforms the
+`/velodyne_points` stream once instead of once per H.
+
+Scan files are .npz archives with:
+  points    (N, 3) LiDAR points x_{k,j} in the sensor frame
+  position  (3,) odometry position p_k
+  stamp     scan time [s] and t (N,) per-point time offsets [s] (optional,
+            used with --odom)
+As in the LU node, by default R_k = I and only the translation is applied.
+With --odom (a TUM trajectory, e.g. the 200 Hz odom_to_tf output) every
+point gets the full SE(3) pose interpolated at stamp + t_j (lu_deskew.py).
+An optional voxel-grid stage (--voxel-size) caps the point count of large
+windows.
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lu_deskew import OdomBuffer, deskew, transform
+from lu_store import PointStore
+from lu_voxel import KEEP_MODES, voxel_dedup
+
+
+class MultiHistoryLU:
+    """
+    Sliding window for all history sizes at once, backed by a PointStore
+    of max(H) slots: the last H scans are always contiguous, so every window
+    is a view. Rows beyond a scan's point count are NaN padding; downstream
+    projection drops them with its finiteness check.
+    """
+
+    def __init__(self, histories: Sequence[int], max_points: int):
+        hs = sorted({int(h) for h in histories})
+        if not hs or hs[0] < 1:
+            raise ValueError("histories must be a non-empty list of sizes >= 1")
+        self.histories = hs
+        self.hmax = hs[-1]
+        self.store = PointStore(self.hmax, max_points)
+        self._origin = np.full((self.hmax * self.store.capacity, 3), np.nan, dtype=np.float32)
+        self._position = np.zeros(3, dtype=np.float32)
+        self.last_counts: Dict[int, Tuple[int, int]] = {}
+
+    def push(
+        self,
+        points: np.ndarray,
+        position: np.ndarray,
+        rotation: Optional[np.ndarray] = None,
+        *,
+        t: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Transform one scan into the odom frame and make it the newest slot.
+        Without `rotation` only the translation is applied (R_k = I).
+        """
+        self._position[:] = position
+        if rotation is None:
+            self.store.push(points, offset=self._position, t=t)
+        else:
+            rotation = np.asarray(rotation, dtype=np.float32)
+            self.store.push(transform(points[:, :3].astype(np.float32), rotation, self._position), t=t)
+        self._update_origin(rotation)
+
+    def push_odom(
+        self,
+        points: np.ndarray,
+        position: np.ndarray,
+        rotation: Optional[np.ndarray] = None,
+        *,
+        t: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Make a scan that is already in the odom frame (e.g. deskewed) the newest
+        slot; (rotation, position) is the reference pose for the origin windows.
+        """
+        self._position[:] = position
+        self.store.push(points, t=t)
+        self._update_origin(None if rotation is None else np.asarray(rotation, dtype=np.float32))
+
+    def _update_origin(self, rotation: Optional[np.ndarray]) -> None:
+        # origin-aligned copy of the widest window; narrower ones are prefixes
+        window = self.store.xyz(self.hmax)
+        origin = self._origin[:window.shape[0]]
+        np.subtract(window, self._position, out=origin)
+        if rotation is not None:
+            # R_k^T (y - p_k) for row vectors
+            np.matmul(origin, rotation, out=origin)
+
+    def cumulative(self, h: int) -> np.ndarray:
+        """
+        Y_k^cum for history h in the odom frame, as a (rows, 3) view with NaN padding.
+        """
+        return self.store.xyz(h)
+
+    def cumulative_origin(self, h: int) -> np.ndarray:
+        """
+        Z_k^cum for history h (moved back by the current pose), as a view.
+        """
+        return self._origin[:self.store.xyz(h).shape[0]]
+
+    def point_count(self, h: int) -> int:
+        return self.store.point_count(h)
+
+    def windows(
+        self,
+        origin: bool = True,
+        *,
+        voxel_size: Optional[float] = None,
+        voxel_keep: str = "nearest",
+    ) -> Dict[int, np.ndarray]:
+        """
+        Cumulative cloud for every history. With voxel_size set, each window
+        is reduced to one point per voxel (a compact copy instead of a view)
+        and the (before, after) point counts are kept in `last_counts`.
+        """
+        get = self.cumulative_origin if origin else self.cumulative
+        if voxel_size is None:
+            self.last_counts = {h: (self.point_count(h),) * 2 for h in self.histories}
+            return {h: get(h) for h in self.histories}
+
+        out = {}
+        self.last_counts = {}
+        for h in self.histories:
+            # odom-frame windows: "nearest" is measured from the current sensor position p_k
+            pts, n_before, n_after = voxel_dedup(get(h), voxel_size, keep=voxel_keep,
+                                                 sensor=None if origin else self._position)
+            out[h] = pts
+            self.last_counts[h] = (n_before, n_after)
+        return out
+
+
+def load_scan(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    with np.load(path) as z:
+        return np.asarray(z["points"])[:, :3], np.asarray(z["position"])
+
+
+def load_scan_time(path: Path) -> Tuple[float, Optional[np.ndarray]]:
+    """
+    Scan stamp and per-point time offsets (None if the scan has no `t`).
+    """
+    with np.load(path) as z:
+        if "stamp" not in z.files:
+            raise ValueError(f"{path} has no 'stamp'; needed to interpolate odometry")
+        return float(z["stamp"]), (np.asarray(z["t"]) if "t" in z.files else None)
+
+
+def lu_sweep(
+    scans: Iterable[Path],
+    histories: Sequence[int],
+    *,
+    max_points: int = 32768,
+    origin: bool = True,
+    voxel_size: Optional[float] = None,
+    voxel_keep: str = "nearest",
+    counts: Optional[Dict[int, List[Tuple[int, int]]]] = None,
+    odom: Optional[OdomBuffer] = None,
+    deskew_resolution: Optional[float] = None,
+) -> Iterator[Tuple[Path, Dict[int, np.ndarray]]]:
+    """
+    Yield (scan path, {H: cumulative view}) for each scan. Views are only
+    valid until the next scan is pulled from the generator. If `counts` is
+    given, per-scan (before, after) point counts are appended to it per H.
+    With `odom`, scans are deskewed with the full interpolated SE(3) pose.
+    """
+    lu = MultiHistoryLU(histories, max_points)
+    for path in scans:
+        points, position = load_scan(path)
+        if odom is None:
+            lu.push(points, position)
+        else:
+            stamp, offsets = load_scan_time(path)
+            rotation, position = odom.pose(stamp)
+            lu.push_odom(deskew(points, offsets, stamp, odom, resolution=deskew_resolution),
+                         position, rotation, t=offsets)
+        windows = lu.windows(origin=origin, voxel_size=voxel_size, voxel_keep=voxel_keep)
+        if counts is not None:
+            for h, c in lu.last_counts.items():
+                counts.setdefault(h, []).append(c)
+        yield path, windows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="LU cumulative clouds for several history sizes in one pass.")
+    ap.add_argument("--scans", nargs="+", required=True, help="Scan .npz files (points, position), in time order")
+    ap.add_argument("--histories", nargs="+", type=int, default=[1, 2, 5, 10], help="History sizes H")
+    ap.add_argument("--max-points", type=int, default=32768, help="Slot capacity (points per scan)")
+    ap.add_argument("--frame", choices=["origin", "odom"], default="origin",
+                    help="origin: /cumulative_origin_point_cloud, odom: /cumulative_point_cloud")
+    ap.add_argument("--voxel-size", type=float, default=None,
+                    help="Optional voxel edge length [m]; keeps one point per voxel")
+    ap.add_argument("--voxel-keep", choices=KEEP_MODES, default="nearest",
+                    help="Voxel representative: nearest to sensor or most recent scan")
+    ap.add_argument("--odom", default=None,
+                    help="Odometry TUM file; applies the full SE(3) pose per point at stamp + t (deskew)")
+    ap.add_argument("--deskew-resolution", type=float, default=None,
+                    help="Bin per-point times to this step [s] (one pose per bin) instead of one pose per point")
+    ap.add_argument("--out", required=True, help="Writes <out>/lu_H<h>/<scan>.npy (finite points only)")
+    args = ap.parse_args()
+
+    out_root = Path(args.out)
+    out_dirs = {}
+    for h in sorted(set(args.histories)):
+        out_dirs[h] = out_root / f"lu_H{h}"
+        out_dirs[h].mkdir(parents=True, exist_ok=True)
+
+    odom = OdomBuffer.from_tum(Path(args.odom)) if args.odom else None
+    n = 0
+    counts: Dict[int, List[Tuple[int, int]]] = {}
+    scans = [Path(x) for x in args.scans]
+    for path, windows in lu_sweep(scans, args.histories, max_points=args.max_points,
+                                  origin=(args.frame == "origin"), voxel_size=args.voxel_size,
+                                  voxel_keep=args.voxel_keep, counts=counts, odom=odom,
+                                  deskew_resolution=args.deskew_resolution):
+        for h, pts in windows.items():
+            np.save(out_dirs[h] / f"{path.stem}.npy", pts[np.isfinite(pts[:, 2])])
+        n += 1
+
+    for h in sorted(counts):
+        c = np.asarray(counts[h], dtype=float)
+        print(f"H={h:<3} mean points/scan: {c[:, 0].mean():.0f} -> {c[:, 1].mean():.0f}")
+    print(f"[OK] {n} scans, histories {sorted(set(args.histories))} in one pass. Outputs in {out_root}/")
+
+
+if __name__ == "__main__":
+    main()
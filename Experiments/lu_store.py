@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Preallocated ring-buffer point store for the LU cumulative cloud Y_k^cum.
+
+The window is one structured NumPy array split into fixed-capacity slots with
+per-slot offsets and counts. A new scan overwrites the oldest slot in place
+and the cumulative cloud is a view, so there is no per-scan re-concatenation
+of H point arrays (O(H*N) copy + allocation) as with a list of scans.
+
+Run `python3 lu_store.py --histories 1 2 5 10 20 50` to benchmark per-scan
+latency and allocations against the concatenate-based window.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from collections import deque
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+POINT_DTYPE = np.dtype([("x", np.float32), ("y", np.float32), ("z", np.float32), ("t", np.float32)])
+
+
+class PointStore:
+    """
+    Window of the last `slots` scans, newest first.
+
+    Slots are mirrored (slot s and s+slots hold the same scan) so the newest
+    h scans always occupy the contiguous slots [head, head+h); rows past a
+    scan's count are NaN padding. `t` is a free per-point channel (e.g. the
+    time offset used for deskewing).
+    """
+
+    def __init__(self, slots: int, capacity: int):
+        if slots < 1 or capacity < 1:
+            raise ValueError("slots and capacity must be >= 1")
+        self.slots = int(slots)
+        self.capacity = int(capacity)
+        self.data = np.empty(2 * self.slots * self.capacity, dtype=POINT_DTYPE)
+        self.data.view(np.float32)[:] = np.nan
+        self.offsets = np.arange(2 * self.slots, dtype=np.int64) * self.capacity
+        self.counts = np.zeros(2 * self.slots, dtype=np.int64)
+        self.head = 0
+        self.filled = 0
+        self._f32 = self.data.view(np.float32).reshape(-1, len(POINT_DTYPE.names))
+
+    def _fill_slot(self, slot: int, xyz: np.ndarray, offset: Optional[np.ndarray], t: Optional[np.ndarray]) -> None:
+        n = xyz.shape[0]
+        start = self.offsets[slot]
+        rows = self._f32[start:start + self.capacity]
+        if offset is None:
+            rows[:n, :3] = xyz
+        else:
+            np.add(xyz, offset, out=rows[:n, :3])
+        rows[:n, 3] = 0.0 if t is None else t
+        prev = self.counts[slot]
+        if prev > n:
+            rows[n:prev] = np.nan
+        self.counts[slot] = n
+
+    def push(self, xyz: np.ndarray, *, offset: Optional[np.ndarray] = None, t: Optional[np.ndarray] = None) -> int:
+        """
+        Overwrite the oldest slot with a scan (optionally translated by `offset`).
+        Returns the slot index that now holds the newest scan.
+        """
+        n = xyz.shape[0]
+        if n > self.capacity:
+            raise ValueError(f"Scan has {n} points, slot capacity is {self.capacity}")
+        self.head = (self.head - 1) % self.slots
+        self._fill_slot(self.head, xyz, offset, t)
+        self._fill_slot(self.head + self.slots, xyz, offset, t)
+        self.filled = min(self.filled + 1, self.slots)
+        return self.head
+
+    def _rows(self, h: int) -> int:
+        if h > self.slots:
+            raise ValueError(f"History {h} exceeds store size {self.slots}")
+        return min(h, self.filled) * self.capacity
+
+    def window(self, h: int) -> np.ndarray:
+        """
+        Structured view of the newest h scans (NaN-padded rows included).
+        """
+        start = self.offsets[self.head]
+        return self.data[start:start + self._rows(h)]
+
+    def xyz(self, h: int) -> np.ndarray:
+        """
+        (rows, 3) float32 view of the newest h scans.
+        """
+        start = self.offsets[self.head]
+        return self._f32[start:start + self._rows(h), :3]
+
+    def point_count(self, h: int) -> int:
+        k = min(h, self.filled)
+        return int(self.counts[self.head:self.head + k].sum())
+
+
+# ---- benchmark ----
+
+def _bench_one(h: int, n_points: int, n_scans: int, make_window, push) -> tuple:
+    rng = np.random.default_rng(0)
+    scans = [rng.standard_normal((n_points, 3)).astype(np.float32) for _ in range(4)]
+    for i in range(h):
+        push(scans[i % 4])
+
+    lat = []
+    tracemalloc.start()
+    peak_sum = 0
+    n_allocs = 0
+    for i in range(n_scans):
+        tracemalloc.reset_peak()
+        cur0, _ = tracemalloc.get_traced_memory()
+        t0 = time.perf_counter()
+        push(scans[i % 4])
+        w = make_window()
+        lat.append(time.perf_counter() - t0)
+        del w
+        _, peak = tracemalloc.get_traced_memory()
+        peak_sum += peak - cur0
+        # a scan-sized buffer or larger means the window was materialized
+        n_allocs += int(peak - cur0 >= n_points * 3 * 4)
+    tracemalloc.stop()
+
+    lat_ms = np.asarray(lat) * 1e3
+    return float(np.median(lat_ms)), float(np.percentile(lat_ms, 95)), peak_sum / n_scans / 1024.0, n_allocs / n_scans
+
+
+def benchmark(histories: Sequence[int], n_points: int, n_scans: int) -> None:
+    print(f"{'H':>4} {'method':>8} {'p50_ms':>9} {'p95_ms':>9} {'alloc_KiB/scan':>15} {'big_allocs/scan':>16}")
+    for h in histories:
+        hist: deque = deque(maxlen=h)
+        res_concat = _bench_one(h, n_points, n_scans, lambda: np.concatenate(hist), hist.append)
+
+        store = PointStore(h, n_points)
+        res_store = _bench_one(h, n_points, n_scans, lambda: store.xyz(h), store.push)
+
+        for name, r in (("concat", res_concat), ("store", res_store)):
+            print(f"{h:>4} {name:>8} {r[0]:>9.3f} {r[1]:>9.3f} {r[2]:>15.1f} {r[3]:>16.2f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the LU point store against per-scan concatenation.")
+    ap.add_argument("--histories", nargs="+", type=int, default=[1, 2, 5, 10, 20, 50])
+    ap.add_argument("--points", type=int, default=28800, help="Points per scan (VLP-16 ~ 28.8k)")
+    ap.add_argument("--scans", type=int, default=200, help="Timed scans per configuration")
+    args = ap.parse_args()
+    benchmark(args.histories, args.points, args.scans)
+
+
+if __name__ == "__main__":
+    main()
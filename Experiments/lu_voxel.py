@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Voxel-grid point budget for the LU cumulative cloud.
+
+Keeps one representative point per voxel so the number of points that reach
+DMF projection / z-buffering stops growing with the history size H. Voxel
+indices are packed into one int64 key (21 bits per axis) and reduced with a
+sort, no Python loops.
+"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+KEEP_MODES = ("nearest", "recent")
+
+_BITS = 21
+_BIAS = 1 << (_BITS - 1)
+_MASK = (1 << _BITS) - 1
+
+
+def voxel_keys(xyz: np.ndarray, voxel_size: float) -> np.ndarray:
+    """
+    Integer hash of the voxel each point falls into.
+    Exact for voxel indices within +-2^20 per axis.
+    """
+    ijk = np.floor(xyz / voxel_size).astype(np.int64)
+    ijk += _BIAS
+    ijk &= _MASK
+    return (ijk[:, 0] << (2 * _BITS)) | (ijk[:, 1] << _BITS) | ijk[:, 2]
+
+
+def voxel_dedup(
+    xyz: np.ndarray,
+    voxel_size: float,
+    *,
+    keep: str = "nearest",
+    sensor: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, int, int]:
+    """
+    Deduplicate a cloud to one point per voxel.
+
+    keep:
+      - "nearest": the point closest to the sensor, at `sensor` in the frame
+        of xyz (default: the frame origin, as for origin-aligned windows)
+      - "recent": the first point in input order (LU windows are newest-first)
+
+    Non-finite rows (store padding) are dropped. Returns (points, n_before, n_after).
+    """
+    if keep not in KEEP_MODES:
+        raise ValueError(f"Unknown keep mode '{keep}', expected one of {KEEP_MODES}")
+    if voxel_size <= 0:
+        raise ValueError("voxel_size must be > 0")
+
+    pts = xyz[np.isfinite(xyz).all(axis=1)]
+    n_before = pts.shape[0]
+    if n_before == 0:
+        return pts, 0, 0
+
+    keys = voxel_keys(pts, voxel_size)
+    if keep == "recent":
+        _, first = np.unique(keys, return_index=True)
+    else:
+        d = pts if sensor is None else pts - np.asarray(sensor, dtype=pts.dtype)
+        r2 = np.einsum("ij,ij->i", d, d)
+        order = np.lexsort((r2, keys))
+        ks = keys[order]
+        head = np.empty(ks.shape[0], dtype=bool)
+        head[0] = True
+        np.not_equal(ks[1:], ks[:-1], out=head[1:])
+        first = order[head]
+
+    out = pts[np.sort(first)]
+    return out, n_before, out.shape[0]
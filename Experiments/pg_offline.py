@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Offline NumPy Papoulis-Gerchberg (PG) reconstruction with checkpoint snapshots.
+
+One PG run over a frame emits the fused depth at every requested iteration
+count, so an I-sweep such as {0, 10, 33, 100} costs max(I) iterations per
+frame instead of sum(I). Iteration t is the state after t PG updates (the same
+convention as `iters_to_show` in Figures/pg_plot.py); t=0 is the DMF output.
+
+Frame files are .npz archives with:
+  zed    inpainted ZED depth D_ZED(v,u), finite everywhere
+  lidar  filtered LiDAR anchor depth D_L^c(v,u), NaN where no anchor
+  mask   ZED invalidity mask M(v,u) (bool), reapplied on publish
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend import BACKENDS, default_backend, get_backend
+from precision import DEFAULT_PRECISION, PRECISIONS, Precision, get_precision
+
+
+FILTER_TYPES = ("gaussian", "butterworth", "brick-wall")
+# node defaults: normalized vertical / horizontal cutoff
+NCUTOFF = 0.16
+NCUTOFF_H = 0.08
+
+
+def lowpass_mask(
+    shape: Tuple[int, int],
+    *,
+    filter_type: str = "gaussian",
+    ncutoff: float = NCUTOFF,
+    ncutoff_h: Optional[float] = NCUTOFF_H,
+    order: int = 3,
+) -> np.ndarray:
+    """
+    Frequency response in rfft2 layout (rows, cols // 2 + 1).
+
+    Cutoffs are normalized to Nyquist per axis (ncutoff vertical, ncutoff_h
+    horizontal, None for the same as ncutoff), which gives the elliptical mask that
+    behaves consistently on non-square depth images.
+    """
+    if filter_type not in FILTER_TYPES:
+        raise ValueError(f"Unknown filter_type '{filter_type}', expected one of {FILTER_TYPES}")
+    rows, cols = shape
+    cv = float(ncutoff)
+    ch = float(ncutoff if ncutoff_h is None else ncutoff_h)
+
+    fy = np.fft.fftfreq(rows) / 0.5
+    fx = np.fft.rfftfreq(cols) / 0.5
+    r2 = (fy[:, None] / cv) ** 2 + (fx[None, :] / ch) ** 2
+
+    if filter_type == "brick-wall":
+        return (r2 <= 1.0).astype(float)
+    if filter_type == "gaussian":
+        return np.exp(-0.5 * r2)
+    return 1.0 / (1.0 + r2 ** order)
+
+
+def initial_estimate(zed: np.ndarray, lidar: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    DMF fit rule: LiDAR depth where an anchor exists, inpainted ZED elsewhere.
+    Returns (D_fit before masking, anchor mask M_L).
+    """
+    anchor_mask = np.isfinite(lidar)
+    return np.where(anchor_mask, lidar, zed), anchor_mask
+
+
+def pg_iterate(
+    d_init: np.ndarray,
+    anchors: np.ndarray,
+    anchor_mask: np.ndarray,
+    lpf: np.ndarray,
+    checkpoints: Iterable[int],
+    *,
+    precision: Precision = PRECISIONS[DEFAULT_PRECISION],
+    backend=None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Run PG once up to max(checkpoints) and yield (t, recon) at each checkpoint.
+
+    The iterate, anchors and filter are held in the precision's compute dtype,
+    so float32 runs complex64 FFTs. FFTs and array storage come from `backend`
+    (see backend.py; default: scipy.fft). The yielded array is the live
+    iterate on the host; copy it if it has to outlive the next step of the
+    generator.
+    """
+    if not np.isfinite(d_init).all():
+        # one NaN would spread over the whole frame through the FFT
+        raise ValueError("PG needs a finite initial estimate; inpaint the ZED depth first")
+    cps = sorted({int(c) for c in checkpoints})
+    if not cps or cps[0] < 0:
+        raise ValueError("checkpoints must be a non-empty list of iteration counts >= 0")
+    wanted = set(cps)
+    last = cps[-1]
+    shape = d_init.shape
+
+    be = backend or default_backend()
+    xp = be.xp
+    dtype = precision.compute
+    recon = xp.array(be.asarray(d_init), dtype=dtype, copy=True)
+    anchors = be.asarray(anchors, dtype=dtype)
+    anchor_mask = be.asarray(anchor_mask)
+    lpf = be.asarray(lpf, dtype=dtype)
+    for t in range(last + 1):
+        if t in wanted:
+            yield t, be.to_host(recon)
+        if t == last:
+            break
+        # data constraint, then bandlimit constraint
+        xp.copyto(recon, anchors, where=anchor_mask)
+        spec = be.rfft2(recon)
+        spec *= lpf
+        recon = be.irfft2(spec, s=shape).astype(dtype, copy=False)
+
+
+def publish(
+    recon: np.ndarray,
+    anchors: np.ndarray,
+    anchor_mask: np.ndarray,
+    invalid_mask: np.ndarray,
+    dtype=None,
+) -> np.ndarray:
+    """
+    Publish rule: keep LiDAR anchors, NaN where the ZED input was invalid.
+    """
+    out = np.where(anchor_mask, anchors, recon)
+    if dtype is not None:
+        out = out.astype(dtype, copy=False)
+    out[invalid_mask] = np.nan
+    return out
+
+
+def pg_checkpoints(
+    zed: np.ndarray,
+    lidar: np.ndarray,
+    invalid_mask: np.ndarray,
+    checkpoints: Sequence[int],
+    *,
+    lpf: Optional[np.ndarray] = None,
+    filter_type: str = "gaussian",
+    ncutoff: float = NCUTOFF,
+    ncutoff_h: Optional[float] = NCUTOFF_H,
+    order: int = 3,
+    precision: str = DEFAULT_PRECISION,
+    backend=None,
+) -> Dict[int, np.ndarray]:
+    """
+    Fused depth D_PG for every checkpoint iteration of a single frame.
+    Outputs are in the precision's storage dtype.
+    """
+    prec = get_precision(precision)
+    zed = np.asarray(zed, dtype=prec.storage)
+    lidar = np.asarray(lidar, dtype=prec.storage)
+    if lpf is None:
+        lpf = lowpass_mask(zed.shape, filter_type=filter_type, ncutoff=ncutoff,
+                           ncutoff_h=ncutoff_h, order=order)
+    d_init, anchor_mask = initial_estimate(zed, lidar)
+    return {
+        t: publish(recon, lidar, anchor_mask, invalid_mask, prec.storage)
+        for t, recon in pg_iterate(d_init, lidar, anchor_mask, lpf, checkpoints, precision=prec,
+                                   backend=backend)
+    }
+
+
+def load_frame(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    with np.load(path) as z:
+        return z["zed"], z["lidar"], z["mask"].astype(bool)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Single-pass PG over frames with outputs at several iteration counts.")
+    ap.add_argument("--frames", nargs="+", required=True, help="Frame .npz files (zed, lidar, mask)")
+    ap.add_argument("--checkpoints", nargs="+", type=int, default=[0, 10, 33, 100],
+                    help="Iteration counts to emit, e.g. 0 10 33 100")
+    ap.add_argument("--history", type=int, required=True, help="LU history size H the frames were built with")
+    ap.add_argument("--out", required=True, help="Root folder; writes <out>/<I>_<H>/pg_depth/<frame>.npy")
+    ap.add_argument("--filter-type", default="gaussian", choices=FILTER_TYPES)
+    ap.add_argument("--ncutoff", type=float, default=NCUTOFF, help="Normalized vertical cutoff")
+    ap.add_argument("--ncutoff-h", type=float, default=NCUTOFF_H, help="Normalized horizontal cutoff")
+    ap.add_argument("--order", type=int, default=3, help="Butterworth order")
+    ap.add_argument("--precision", default=DEFAULT_PRECISION, choices=sorted(PRECISIONS),
+                    help="float64 reference, float32 (complex64 FFT), float16 storage + float32 compute")
+    ap.add_argument("--backend", default=None, choices=BACKENDS, help="FFT backend (default: $PG_BACKEND or scipy)")
+    ap.add_argument("--threads", type=int, default=None, help="FFT worker threads (default: $PG_THREADS or CPU count)")
+    args = ap.parse_args()
+    backend = get_backend(args.backend, args.threads)
+
+    out_root = Path(args.out)
+    out_dirs = {}
+    for t in sorted(set(args.checkpoints)):
+        d = out_root / f"{t}_{args.history}" / "pg_depth"
+        d.mkdir(parents=True, exist_ok=True)
+        out_dirs[t] = d
+
+    lpf, lpf_shape = None, None
+    for f in sorted(Path(x) for x in args.frames):
+        zed, lidar, mask = load_frame(f)
+        if zed.shape != lpf_shape:
+            lpf_shape = zed.shape
+            lpf = lowpass_mask(zed.shape, filter_type=args.filter_type, ncutoff=args.ncutoff,
+                               ncutoff_h=args.ncutoff_h, order=args.order)
+        for t, depth in pg_checkpoints(zed, lidar, mask, args.checkpoints, lpf=lpf,
+                                       precision=args.precision, backend=backend).items():
+            np.save(out_dirs[t] / f"{f.stem}.npy", depth.astype(np.float32))
+
+    n_iter = max(args.checkpoints)
+    print(f"[OK] {len(args.frames)} frames, {n_iter} PG iterations/frame "
+          f"(separate runs would need {sum(set(args.checkpoints))}). Outputs in {out_root}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Pipelined stage executor: one worker thread per stage, bounded queues between them.
+
+While PG runs on frame k, DMF can already project frame k+1 and LU can push
+frame k+2; the heavy work (FFTs, sorts, ufuncs) releases the GIL, so with
+enough cores the sustained rate approaches the slowest stage instead of the
+sum of all stages. Every stage is a single FIFO worker, so frames leave in
+input order. A full queue blocks its producer (backpressure), which bounds
+the number of frames in flight to stages * (maxsize + 1).
+
+Stage functions must not hand out buffers they overwrite on the next call
+(copy pooled outputs when running threaded).
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+_DONE = object()
+_POLL = 0.1  # s between checks of the stop event while blocked on a queue
+
+
+class _Failure:
+    def __init__(self, stage: str, exc: BaseException):
+        self.stage = stage
+        self.exc = exc
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """
+    Blocking put that gives up once stop is set (False), so an aborted run
+    does not leave a producer blocked on a full queue forever.
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    """
+    Blocking get that returns _DONE once stop is set.
+    """
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+class StageWorker(threading.Thread):
+    def __init__(self, name: str, fn: Callable[[Any], Any], inbox: queue.Queue, outbox: queue.Queue,
+                 on_sample: Optional[Callable[[str, float], None]] = None,
+                 stop: Optional[threading.Event] = None):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.on_sample = on_sample
+        self.stop = stop or threading.Event()
+        self.busy = 0.0
+        self.items = 0
+
+    def run(self) -> None:
+        while True:
+            item = _get(self.inbox, self.stop)
+            if item is _DONE or isinstance(item, _Failure):
+                _put(self.outbox, item, self.stop)
+                return
+            t0 = time.perf_counter()
+            try:
+                out = self.fn(item)
+            except BaseException as e:  # surfaced in the consumer thread
+                _put(self.outbox, _Failure(self.stage, e), self.stop)
+                return
+            dt = time.perf_counter() - t0
+            self.busy += dt
+            self.items += 1
+            if self.on_sample:
+                self.on_sample(self.stage, dt)
+            if not _put(self.outbox, out, self.stop):
+                return
+
+
+class PipelineExecutor:
+    """
+    Run (name, fn) stages concurrently over an input stream.
+
+    for out in PipelineExecutor(stages).run(frames): ...
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Tuple[str, Callable[[Any], Any]]],
+        *,
+        maxsize: int = 2,
+        on_sample: Optional[Callable[[str, float], None]] = None,
+    ):
+        if not stages:
+            raise ValueError("PipelineExecutor needs at least one stage")
+        self.stages = list(stages)
+        self.maxsize = int(maxsize)
+        self.on_sample = on_sample
+        self.workers: List[StageWorker] = []
+        self.wall = 0.0
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in range(len(self.stages) + 1)]
+        # set when the consumer stops (done, failed or closed early); every
+        # thread blocked on a queue then exits instead of holding its frames
+        stop = threading.Event()
+        self.workers = [
+            StageWorker(name, fn, queues[i], queues[i + 1], self.on_sample, stop)
+            for i, (name, fn) in enumerate(self.stages)
+        ]
+
+        def feed() -> None:
+            end: Any = _DONE
+            try:
+                for item in items:
+                    if not _put(queues[0], item, stop):
+                        return
+            except BaseException as e:  # e.g. a corrupt frame in the reader; forwarded like a stage failure
+                end = _Failure("feed", e)
+            finally:
+                # always terminate the chain, or the consumer waits forever
+                _put(queues[0], end, stop)
+
+        feeder = threading.Thread(target=feed, name="stage-feed", daemon=True)
+        t0 = time.perf_counter()
+        for w in self.workers:
+            w.start()
+        feeder.start()
+        try:
+            while True:
+                out = queues[-1].get()
+                if out is _DONE:
+                    break
+                if isinstance(out, _Failure):
+                    raise RuntimeError(f"Stage '{out.stage}' failed") from out.exc
+                yield out
+        finally:
+            stop.set()
+            self.wall = time.perf_counter() - t0
+
+    def utilization(self) -> Dict[str, float]:
+        """
+        Busy fraction of each stage's worker over the run's wall time.
+        """
+        if self.wall <= 0:
+            return {w.stage: 0.0 for w in self.workers}
+        return {w.stage: w.busy / self.wall for w in self.workers}
+
+    def bottleneck(self) -> Optional[str]:
+        util = self.utilization()
+        return max(util, key=util.get) if util else None
@@ -0,0 +1,41 @@
+"""
+Numeric precision modes shared by the offline PG and DMF modules.
+
+  float64   reference: float64 storage and compute, complex128 FFTs
+  float32   float32 storage and compute, complex64 FFTs
+  float16   float16 storage (inputs, pooled buffers, outputs), float32 compute
+
+DEFAULT_PRECISION is the default of PG and of every --precision flag that
+drives it (pg_offline, replay, pg_filter_sweep, backend), so the sweep, the
+benchmark and the pipeline score PG in the same mode. DMFStage on its own keeps
+its float32 buffer pool; replay passes its one --precision to DMF and PG.
+
+Compute dtypes follow NumPy >= 2 FFT semantics (float32 in, complex64 out).
+"""
+from __future__ import annotations
+
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+
+class Precision(NamedTuple):
+    name: str
+    storage: type
+    compute: type
+
+
+DEFAULT_PRECISION = "float64"
+
+PRECISIONS: Dict[str, Precision] = {
+    "float64": Precision("float64", np.float64, np.float64),
+    "float32": Precision("float32", np.float32, np.float32),
+    "float16": Precision("float16", np.float16, np.float32),
+}
+
+
+def get_precision(name: str) -> Precision:
+    try:
+        return PRECISIONS[name]
+    except KeyError:
+        raise ValueError(f"Unknown precision '{name}', expected one of {tuple(PRECISIONS)}") from None
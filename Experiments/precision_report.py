@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Accuracy / speed / memory report for the PG and DMF precision modes.
+
+The same frames go through DMF fit/merge and PG once per mode (float64,
+float32, float16 storage); the published depth at the last checkpoint is
+compared with the float64 reference (max and RMS deviation over finite
+pixels) next to the per-frame time and the peak memory allocated per frame.
+
+Frames are .npz files with zed_orig (raw ZED depth) and lidar (projected D_L);
+without --frames a synthetic 1280x720 sequence is used.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from dmf_inpaint import inpaint_nearest, synthetic_frame
+from dmf_stage import Crop, DMFStage
+from pg_offline import FILTER_TYPES, NCUTOFF, NCUTOFF_H, lowpass_mask, pg_checkpoints
+from precision import PRECISIONS
+
+Inputs = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def synthetic_sequence(n: int, seed: int = 0) -> List[Inputs]:
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(n):
+        zed_orig = synthetic_frame(rng).astype(np.float32)
+        lidar = np.full(zed_orig.shape, np.nan, dtype=np.float32)
+        hit = rng.random(zed_orig.shape) < 0.03
+        truth = inpaint_nearest(zed_orig)
+        lidar[hit] = truth[hit] + rng.normal(0.0, 0.05, hit.sum()).astype(np.float32)
+        frames.append((zed_orig, lidar))
+    return frames
+
+
+def load_inputs(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    with np.load(path) as z:
+        return z["zed_orig"], z["lidar"]
+
+
+def run_mode(
+    frames: List[Tuple[np.ndarray, np.ndarray]],
+    precision: str,
+    *,
+    crop: Crop,
+    tau: float,
+    iterations: int,
+    lpf: np.ndarray,
+) -> Tuple[List[np.ndarray], float, float]:
+    """
+    Returns (published depth per frame, mean seconds/frame, mean peak bytes/frame).
+    """
+    h, w = frames[0][0].shape
+    stage = DMFStage(w, h, crop=crop, tau=tau, precision=precision)
+    storage = PRECISIONS[precision].storage
+    outs, secs, peaks = [], [], []
+    tracemalloc.start()
+    for zed_orig, lidar in frames:
+        zed = inpaint_nearest(zed_orig).astype(storage)
+        zo = zed_orig.astype(storage)
+        li = lidar.astype(storage)
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        t0 = time.perf_counter()
+        dmf = stage.process(zo, zed, li)
+        pg = pg_checkpoints(zed, dmf.anchors, dmf.mask, [iterations], lpf=lpf, precision=precision)
+        secs.append(time.perf_counter() - t0)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+        outs.append(pg[iterations])
+    tracemalloc.stop()
+    return outs, float(np.mean(secs)), float(np.mean(peaks))
+
+
+def deviation(ref: List[np.ndarray], out: List[np.ndarray]) -> Tuple[float, float]:
+    e = np.concatenate([(o.astype(np.float64) - r).ravel() for r, o in zip(ref, out)])
+    e = e[np.isfinite(e)]
+    if not e.size:
+        return float("nan"), float("nan")
+    return float(np.abs(e).max()), float(np.sqrt(np.mean(e ** 2)))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare PG/DMF precision modes against the float64 reference.")
+    ap.add_argument("--frames", nargs="*", default=[], help="Frame .npz files (zed_orig, lidar)")
+    ap.add_argument("--synthetic", type=int, default=3, help="Synthetic frames when --frames is empty")
+    ap.add_argument("--iterations", type=int, default=33, help="PG iterations I")
+    ap.add_argument("--crop", nargs=4, type=int, default=list(Crop()), metavar=("TOP", "BOTTOM", "LEFT", "RIGHT"))
+    ap.add_argument("--tau", type=float, default=50.0, help="ZED_VLP_DIFF_MAX")
+    ap.add_argument("--filter-type", default="gaussian", choices=FILTER_TYPES)
+    ap.add_argument("--ncutoff", type=float, default=NCUTOFF)
+    ap.add_argument("--ncutoff-h", type=float, default=NCUTOFF_H)
+    ap.add_argument("--order", type=int, default=3)
+    args = ap.parse_args()
+
+    frames = [load_inputs(Path(f)) for f in args.frames] or synthetic_sequence(args.synthetic)
+    lpf = lowpass_mask(frames[0][0].shape, filter_type=args.filter_type, ncutoff=args.ncutoff,
+                       ncutoff_h=args.ncutoff_h, order=args.order)
+
+    results: Dict[str, Tuple[List[np.ndarray], float, float]] = {}
+    for name in ("float64", "float32", "float16"):
+        results[name] = run_mode(frames, name, crop=Crop(*args.crop), tau=args.tau,
+                                 iterations=args.iterations, lpf=lpf)
+
+    ref, t_ref, m_ref = results["float64"]
+    h, w = frames[0][0].shape
+    print(f"frames: {len(frames)}  image: {w}x{h}  PG iterations: {args.iterations}")
+    print(f"{'mode':>8} {'ms/frame':>9} {'speedup':>8} {'peak_MiB':>9} {'mem_saved':>9} {'max_dev':>10} {'rms_dev':>10}")
+    for name, (out, t, m) in results.items():
+        mx, rms = deviation(ref, out)
+        print(f"{name:>8} {t * 1e3:>9.1f} {t_ref / t:>8.2f} {m / 2**20:>9.1f} "
+              f"{(1.0 - m / m_ref) * 100:>8.0f}% {mx:>10.2e} {rms:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
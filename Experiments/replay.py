@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+ROS-free offline replay of the fusion chain LU -> DMF -> PG.
+
+Frames are read from a dataset folder and pushed through the stages as a
+generator pipeline, as fast as the CPU allows (no bag clock). Every stage is
+timed per frame; the run ends with p50/p95/p99 latency per stage, frames per
+second and the real-time factor against the recorded timestamps. With
+--threads the stages run pipelined on worker threads (pipeline_exec.py) and
+the report adds per-stage utilization.
+
+Dataset layout:
+  <root>/camera_info.json   {"width": W, "height": H, "K": [9 floats]}
+  <root>/frames/*.npz       stamp, zed_orig (H, W), points (N, 3), position (3,)
+                            and optionally t (N,) per-point time offsets
+or a frame store written by framestore.py (read through memory-mapped views).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend import BACKENDS, get_backend
+from backproject import BackProjector
+from dmf_inpaint import METHODS as INPAINT_METHODS, fill_unreached
+from dmf_projection import Projector
+from dmf_stage import Crop, DMFOutput, DMFStage
+from framestore import FrameStore, is_frame_store
+from lu_deskew import OdomBuffer, deskew
+from lu_offline import MultiHistoryLU
+from pg_offline import FILTER_TYPES, NCUTOFF, NCUTOFF_H, lowpass_mask, pg_checkpoints
+from pipeline_exec import PipelineExecutor
+from precision import DEFAULT_PRECISION, PRECISIONS
+
+Frame = Dict[str, Any]
+
+
+class StageStats:
+    """
+    Per-stage latency samples (seconds) and run wall time.
+    """
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self.wall = 0.0
+        self.frames = 0
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self, bins: int = 20) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for stage, xs in self.samples.items():
+            a = np.asarray(xs) * 1e3
+            counts, edges = np.histogram(a, bins=bins)
+            out[stage] = {
+                "n": float(a.size),
+                "mean_ms": float(a.mean()),
+                "p50_ms": float(np.percentile(a, 50)),
+                "p95_ms": float(np.percentile(a, 95)),
+                "p99_ms": float(np.percentile(a, 99)),
+                "max_ms": float(a.max()),
+                "hist_counts": counts.tolist(),
+                "hist_edges_ms": edges.tolist(),
+            }
+        return out
+
+
+def timed(name: str, fn: Callable[[Frame], Frame], upstream: Iterable[Frame], stats: StageStats) -> Iterator[Frame]:
+    for frame in upstream:
+        t0 = time.perf_counter()
+        out = fn(frame)
+        stats.add(name, time.perf_counter() - t0)
+        yield out
+
+
+def load_camera_info(root: Path) -> Dict[str, Any]:
+    if is_frame_store(root):
+        return FrameStore(root).camera_info
+    return json.loads((root / "camera_info.json").read_text(encoding="utf-8"))
+
+
+def read_frames(root: Path, limit: Optional[int] = None) -> Iterator[Frame]:
+    if is_frame_store(root):
+        for frame in FrameStore(root).frames(0, limit):
+            # float16 stores are widened once here; float32 stays a view
+            frame["zed_orig"] = np.asarray(frame["zed_orig"], dtype=np.float32)
+            yield frame
+        return
+    files = sorted((root / "frames").glob("*.npz"))
+    for f in files[:limit]:
+        with np.load(f) as z:
+            frame = {
+                "name": f.stem,
+                "stamp": float(z["stamp"]),
+                "zed_orig": z["zed_orig"],
+                "points": z["points"][:, :3],
+                "position": z["position"],
+            }
+            if "t" in z.files:
+                frame["t"] = z["t"]
+        yield frame
+
+
+# ---- stages ----
+
+# Stages that return views into pooled buffers take copy=True when the next
+# stage may still be reading frame k while they already process frame k+1.
+
+def make_lu(history: int, max_points: int, *, copy: bool = False, odom: Optional[OdomBuffer] = None,
+            deskew_resolution: Optional[float] = None) -> Callable[[Frame], Frame]:
+    lu = MultiHistoryLU([history], max_points)
+    warned = False
+
+    def run(frame: Frame) -> Frame:
+        nonlocal warned
+        if odom is None:
+            lu.push(frame["points"], frame["position"])
+        else:
+            # full SE(3) at stamp + t per point instead of the frame position (R_k = I)
+            offsets = frame.get("t")
+            if offsets is None and not warned:
+                warned = True
+                print(f"[warn] frame {frame['name']} has no per-point times 't': --odom applies one pose "
+                      "per scan (re-convert older frame stores to keep them)")
+            rotation, position = odom.pose(frame["stamp"])
+            lu.push_odom(deskew(frame["points"], offsets, frame["stamp"], odom, resolution=deskew_resolution),
+                         position, rotation, t=offsets)
+        cloud = lu.cumulative_origin(history)
+        frame["cloud"] = cloud.copy() if copy else cloud
+        return frame
+    return run
+
+
+def make_dmf(info: Mapping, crop: Crop, tau: float, inpaint: str, *, copy: bool = False,
+             precision: str = DEFAULT_PRECISION) -> Callable[[Frame], Frame]:
+    projector = Projector.from_camera_info(info)
+    stage = DMFStage.from_camera_info(info, crop=crop, tau=tau, precision=precision)
+    d_lidar = np.empty((projector.height, projector.width), dtype=np.float32)
+    fill = INPAINT_METHODS[inpaint]
+
+    def run(frame: Frame) -> Frame:
+        projector.project(frame["cloud"], out=d_lidar)
+        zed = fill(frame["zed_orig"])
+        # PG needs finite input (pg_offline): pixels the inpainter left get the nearest
+        # filled value, a frame without any valid pixel starts from D^(0) = 0
+        finite = np.isfinite(zed)
+        if not finite.all():
+            zed = fill_unreached(zed, finite) if finite.any() else np.zeros_like(zed)
+        out = stage.process(frame["zed_orig"], zed, d_lidar)
+        if copy:
+            out = DMFOutput(*(a.copy() for a in out))
+        frame["zed"] = zed
+        frame["anchors"] = out.anchors
+        frame["mask"] = out.mask
+        frame["d_fit"] = out.d_fit
+        return frame
+    return run
+
+
+def make_pg(info: Mapping, checkpoints: Sequence[int], filter_type: str, ncutoff: float,
+            ncutoff_h: float, order: int, precision: str = DEFAULT_PRECISION,
+            backend=None) -> Callable[[Frame], Frame]:
+    lpf = lowpass_mask((info["height"], info["width"]), filter_type=filter_type,
+                       ncutoff=ncutoff, ncutoff_h=ncutoff_h, order=order)
+
+    def run(frame: Frame) -> Frame:
+        frame["pg"] = pg_checkpoints(frame["zed"], frame["anchors"], frame["mask"], checkpoints, lpf=lpf,
+                                     precision=precision, backend=backend)
+        return frame
+    return run
+
+
+def make_bp(info: Mapping, checkpoint: int, stride: int = 1) -> Callable[[Frame], Frame]:
+    """
+    Back-project the PG depth of one checkpoint into the published cloud,
+    dropping NaN pixels (ray grid cached in backproject.py).
+    """
+    bp = BackProjector.from_camera_info(info, stride=stride)
+
+    def run(frame: Frame) -> Frame:
+        frame["cloud_pg"] = bp.project(frame["pg"][checkpoint])
+        return frame
+    return run
+
+
+def replay(
+    frames: Iterable[Frame],
+    stages: Sequence[tuple],
+    stats: StageStats,
+) -> Iterator[Frame]:
+    """
+    Chain (name, fn) stages over the frame stream; each is timed in `stats`.
+    """
+    stream: Iterable[Frame] = frames
+    for name, fn in stages:
+        stream = timed(name, fn, stream, stats)
+    return iter(stream)
+
+
+def replay_threaded(
+    frames: Iterable[Frame],
+    stages: Sequence[tuple],
+    stats: StageStats,
+    maxsize: int = 2,
+) -> Tuple[PipelineExecutor, Iterator[Frame]]:
+    """
+    Same as `replay`, but every stage runs on its own worker thread.
+    """
+    executor = PipelineExecutor(stages, maxsize=maxsize, on_sample=stats.add)
+    return executor, executor.run(frames)
+
+
+def print_report(stats: StageStats, stamps: List[float]) -> None:
+    print(f"{'stage':>6} {'mean_ms':>9} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'max_ms':>9}")
+    for stage, s in stats.summary().items():
+        print(f"{stage:>6} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+              f"{s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    fps = stats.frames / stats.wall if stats.wall > 0 else float("nan")
+    print(f"frames: {stats.frames}  wall: {stats.wall:.2f} s  fps: {fps:.2f}")
+    if len(stamps) > 1:
+        span = stamps[-1] - stamps[0]
+        print(f"recorded span: {span:.2f} s  real-time factor: {span / stats.wall:.2f}x")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Replay recorded frames through LU -> DMF -> PG without ROS.")
+    ap.add_argument("--dataset", required=True, help="Dataset folder (camera_info.json + frames/*.npz) or frame store")
+    ap.add_argument("--limit", type=int, default=None, help="Only replay the first N frames")
+    ap.add_argument("--history", type=int, default=2, help="LU history size H")
+    ap.add_argument("--max-points", type=int, default=32768, help="LU slot capacity (points per scan)")
+    ap.add_argument("--odom", default=None, help="Odometry TUM file: deskew LU scans with the interpolated SE(3) pose")
+    ap.add_argument("--deskew-resolution", type=float, default=None, help="Deskew time bin [s] (default: per point)")
+    ap.add_argument("--crop", nargs=4, type=int, default=list(Crop()), metavar=("TOP", "BOTTOM", "LEFT", "RIGHT"))
+    ap.add_argument("--tau", type=float, default=50.0, help="ZED_VLP_DIFF_MAX")
+    ap.add_argument("--inpaint", default="diffusion", choices=sorted(INPAINT_METHODS))
+    ap.add_argument("--checkpoints", nargs="+", type=int, default=[33], help="PG iteration counts to emit")
+    ap.add_argument("--filter-type", default="gaussian", choices=FILTER_TYPES)
+    ap.add_argument("--ncutoff", type=float, default=NCUTOFF)
+    ap.add_argument("--ncutoff-h", type=float, default=NCUTOFF_H)
+    ap.add_argument("--order", type=int, default=3)
+    ap.add_argument("--precision", default=DEFAULT_PRECISION, choices=sorted(PRECISIONS),
+                    help="PG/DMF precision: float64 reference, float32, float16 storage")
+    ap.add_argument("--backend", default=None, choices=BACKENDS, help="PG FFT backend (default: $PG_BACKEND or scipy)")
+    ap.add_argument("--fft-threads", type=int, default=None, help="FFT worker threads (default: $PG_THREADS or CPU count)")
+    ap.add_argument("--bp-stride", type=int, default=1, help="Back-projection pixel stride")
+    ap.add_argument("--threads", action="store_true", help="Run the stages pipelined on worker threads")
+    ap.add_argument("--queue-size", type=int, default=2, help="Bounded queue length between threaded stages")
+    ap.add_argument("--out", default=None, help="Optional root; writes <out>/<I>_<H>/pg_depth/<frame>.npy")
+    ap.add_argument("--stats-json", default=None,
+                    help="Optional path for the latency summary (percentiles + histograms) as JSON")
+    args = ap.parse_args()
+
+    root = Path(args.dataset)
+    info = load_camera_info(root)
+    stages = [
+        ("lu", make_lu(args.history, args.max_points, copy=args.threads,
+                       odom=OdomBuffer.from_tum(Path(args.odom)) if args.odom else None,
+                       deskew_resolution=args.deskew_resolution)),
+        ("dmf", make_dmf(info, Crop(*args.crop), args.tau, args.inpaint, copy=args.threads,
+                         precision=args.precision)),
+        ("pg", make_pg(info, args.checkpoints, args.filter_type, args.ncutoff, args.ncutoff_h, args.order,
+                       args.precision, get_backend(args.backend, args.fft_threads))),
+        ("bp", make_bp(info, max(args.checkpoints), args.bp_stride)),
+    ]
+
+    out_dirs = {}
+    if args.out:
+        for t in sorted(set(args.checkpoints)):
+            out_dirs[t] = Path(args.out) / f"{t}_{args.history}" / "pg_depth"
+            out_dirs[t].mkdir(parents=True, exist_ok=True)
+
+    stats = StageStats()
+    stamps: List[float] = []
+    executor = None
+    if args.threads:
+        executor, stream = replay_threaded(read_frames(root, args.limit), stages, stats, args.queue_size)
+    else:
+        stream = replay(read_frames(root, args.limit), stages, stats)
+    t0 = time.perf_counter()
+    for frame in stream:
+        stamps.append(frame["stamp"])
+        for t, depth in frame["pg"].items():
+            if t in out_dirs:
+                np.save(out_dirs[t] / f"{frame['name']}.npy", depth.astype(np.float32))
+        stats.frames += 1
+    stats.wall = time.perf_counter() - t0
+
+    print_report(stats, stamps)
+    if executor is not None:
+        util = executor.utilization()
+        print("utilization: " + "  ".join(f"{k} {v * 100:.0f}%" for k, v in util.items())
+              + f"  (bottleneck: {executor.bottleneck()})")
+    if args.stats_json:
+        Path(args.stats_json).write_text(json.dumps(stats.summary(), indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ BASELINE="${BASELINE:-1}"        # 1 => also generate delta/ratio vs ZED baselin
 GAMMA="${GAMMA:-1}"              # 1 => also generate superposition deviation Γ(I,H)
 GAMMA_HEATMAP="${GAMMA_HEATMAP:-1}" # 1 => also plot heatmap for Γ(I,H)
 BASELINE_REF="${BASELINE_REF:-mean}" # mean | I0H1 (as implemented in analyze.py)
+PLOTS="${PLOTS:-1}"              # 0 => compute-only (--no-plots): matrix/baseline/delta/ratio/gamma CSVs
 
 # -----------------------------
 # Plot styling
@@ -58,7 +59,15 @@ patterns=(
 
 IMAGE="evo-cli"
 ANALYZE="analyze.py"
-mkdir -p out
+
+# optional sharding: SHARD=k NUM_SHARDS=n runs only shard k's analysis jobs and
+# writes them to shards/shard_k/out/ (inputs: the merged */outputs; combine with shard.py merge)
+OUT_ROOT="out"
+if [[ -n "${NUM_SHARDS:-}" ]]; then
+  SHARD_PATH="${SHARD_DIR:-shards}/shard_${SHARD:?Need SHARD}"
+  OUT_ROOT="${SHARD_PATH}/out"
+fi
+mkdir -p "$OUT_ROOT"
 
 jobs_file="$(mktemp)"
 trap 'rm -f "$jobs_file"' EXIT
@@ -83,8 +92,8 @@ for v in "${variants[@]}"; do
     baseline_pattern="${baseline_base}_${suffix}"
 
     for m in "${metrics[@]}"; do
-      outdir="out/${file}/${pattern}/${m}"
-      mkdir -p "$outdir"
+      key="${file}/${pattern}/${m}"
+      outdir="${OUT_ROOT}/${key}"
 
       # -------- surface args --------
       surface_args="--cmap \"$CMAP\" --delta-cmap \"$DELTA_CMAP\" --ratio-cmap \"$RATIO_CMAP\""
@@ -92,6 +101,10 @@ for v in "${variants[@]}"; do
         surface_args="--surface $surface_args"
       fi
 
+      if [[ "$PLOTS" != "1" ]]; then
+        surface_args="--no-plots"
+      fi
+
       # -------- gamma args --------
       gamma_args=""
       if [[ "$GAMMA" == "1" ]]; then
@@ -118,8 +131,9 @@ for v in "${variants[@]}"; do
         fi
       fi
 
-      # One command per line
-      echo "docker run --rm -i $ENV_MPL \
+      # One command per line, keyed by its canonical out/ subfolder
+      printf '%s\t' "$key" >> "$jobs_file"
+      echo "mkdir -p \"$outdir\" && docker run --rm -i $ENV_MPL \
         -v \"$PWD:/work\" -w /work --entrypoint python3 \"$IMAGE\" \"$ANALYZE\" \
         --files ${inputs[*]} \
         --pattern \"$pattern\" \
@@ -133,7 +147,15 @@ for v in "${variants[@]}"; do
   done
 done
 
+if [[ -n "${NUM_SHARDS:-}" ]]; then
+  python3 shard.py select --keyed --shard "$SHARD" --num-shards "$NUM_SHARDS" --by "${SHARD_BY:-hash}" \
+    --manifest "${SHARD_PATH}/MANIFEST_analyze.json" < "$jobs_file" > "${jobs_file}.sel"
+else
+  cut -f2- "$jobs_file" > "${jobs_file}.sel"
+fi
+mv "${jobs_file}.sel" "$jobs_file"
+
 # Parallel execute lines as shell commands
 cat "$jobs_file" | xargs -P "$JOBS" -I{} bash -lc "{}"
 
-echo "[OK] Done (xargs -P). Outputs in ./out/"
+echo "[OK] Done (xargs -P). Outputs in ./${OUT_ROOT}/"
@@ -26,13 +26,28 @@ exps=(
 "100_10"
 )
 
+# optional: experiment list from a file, e.g. sweep_planner.py --out
+if [[ -n "${EXPS_FILE:-}" ]]; then
+    mapfile -t exps < "$EXPS_FILE"
+fi
+
+# optional sharding: SHARD=k NUM_SHARDS=n runs only shard k's experiments and
+# writes them to shards/shard_k/<I>_<H>/outputs (combine with shard.py merge)
+out_root="/work"
+if [[ -n "${NUM_SHARDS:-}" ]]; then
+    shard_dir="${SHARD_DIR:-shards}/shard_${SHARD:?Need SHARD}"
+    mapfile -t exps < <(python3 shard.py select --shard "$SHARD" --num-shards "$NUM_SHARDS" \
+        --by "${SHARD_BY:-hash}" --manifest "${shard_dir}/MANIFEST_evo.json" "${exps[@]}")
+    out_root="/work/${shard_dir}"
+fi
+
 for exp in "${exps[@]}"
 do
-    echo "docker run --rm -i -v ${PWD}:/work -w /work -e GT_ODOM_BAG_FILE=/work/gt.bag -e ZED_ODOM_BAG_FILE=/work/zed*.bag -e PG_ODOM_BAG_FILE=/work/${exp}/${exp}*.bag -e OUT_FOLDER=/work/${exp}/outputs evo-cli evo.sh" \
+    echo "docker run --rm -i -v ${PWD}:/work -w /work -e GT_ODOM_BAG_FILE=/work/gt.bag -e ZED_ODOM_BAG_FILE=/work/zed*.bag -e PG_ODOM_BAG_FILE=/work/${exp}/${exp}*.bag -e OUT_FOLDER=${out_root}/${exp}/outputs evo-cli evo.sh" \
         >> "$jobs_file"
 done
 
 # Parallel execute lines as shell commands
-cat "$jobs_file" | xargs -P "$JOBS" -I{} bash -lc "{}"
+[[ -s "$jobs_file" ]] && cat "$jobs_file" | xargs -P "$JOBS" -I{} bash -lc "{}"
 
 echo "[OK] Done (xargs -P)."
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Deterministic sharding of sweeps over several machines (or processes) and the merge step.
+
+Experiment folders (run_evo.sh) and analysis jobs (run_analyze.sh) are
+assigned to shard k of N either by position in the sorted item list
+(--by index, balanced) or by a SHA-1 of the item name (--by hash, stable
+when items are added). Both scripts switch to sharding when NUM_SHARDS is
+set and then write only into their partial store shards/shard_<k>/:
+
+  SHARD=0 NUM_SHARDS=3 ./run_evo.sh      # on machine 0 (1, 2 on the others)
+  python3 shard.py merge                  # after copying shards/ back
+  SHARD=0 NUM_SHARDS=3 ./run_analyze.sh
+  python3 shard.py merge --cube out/metrics_cube.npz
+
+merge copies every shards/shard_*/<path> to ./<path> (the canonical
+<I>_<H>/outputs and out/ layout), refuses to overwrite differing files,
+checks the shard manifests for missing items, and optionally writes the
+metrics cube of the merged tree. To try it on one machine:
+
+  python3 shard.py run-local --num-shards 3 -- ./run_evo.sh
+"""
+from __future__ import annotations
+
+import argparse
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+SHARD_BY = ("hash", "index")
+
+
+def shard_of(item: str, position: int, num_shards: int, by: str = "hash") -> int:
+    if by == "index":
+        return position % num_shards
+    return int.from_bytes(hashlib.sha1(item.encode("utf-8")).digest()[:8], "big") % num_shards
+
+
+def select(items: Sequence[str], shard: int, num_shards: int, by: str = "hash") -> List[str]:
+    """
+    Items of one shard; positions refer to the sorted, de-duplicated list so
+    every machine computes the same partition.
+    """
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"shard must be in [0, {num_shards}), got {shard}")
+    ordered = sorted(set(items))
+    return [it for i, it in enumerate(ordered) if shard_of(it, i, num_shards, by) == shard]
+
+
+def write_manifest(path: Path, shard: int, num_shards: int, by: str, items: Sequence[str], chosen: Sequence[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"shard": shard, "num_shards": num_shards, "by": by,
+                                "all": sorted(set(items)), "items": list(chosen)}, indent=2), encoding="utf-8")
+
+
+def merge(shard_dir: Path, dest: Path, *, overwrite: bool = False, link: bool = False) -> Dict[str, int]:
+    """
+    Copy shard_dir/shard_*/** into dest; identical files are skipped, differing ones are an error.
+    All conflicts (between shards or with dest) are found before anything is
+    copied, so a refused merge leaves dest untouched.
+    """
+    counts = {"copied": 0, "identical": 0, "replaced": 0}
+    conflicts: List[str] = []
+    plan: Dict[Path, Path] = {}
+    for shard in sorted(p for p in shard_dir.glob("shard_*") if p.is_dir()):
+        for src in sorted(p for p in shard.rglob("*") if p.is_file()):
+            rel = src.relative_to(shard)
+            if rel.name.startswith("MANIFEST"):
+                continue
+            prev = plan.get(rel)
+            if prev is not None:
+                if filecmp.cmp(prev, src, shallow=False):
+                    counts["identical"] += 1
+                    continue
+                if not overwrite:
+                    conflicts.append(f"{src} differs from {prev}")
+                    continue
+                counts["replaced"] += 1
+            plan[rel] = src
+
+    todo = []
+    for rel, src in plan.items():
+        dst = dest / rel
+        if dst.exists():
+            if filecmp.cmp(src, dst, shallow=False):
+                counts["identical"] += 1
+                continue
+            if not overwrite:
+                conflicts.append(f"{dst} differs from {src}")
+                continue
+            counts["replaced"] += 1
+        else:
+            counts["copied"] += 1
+        todo.append((src, dst))
+    if conflicts:
+        more = f"\n  ... and {len(conflicts) - 10} more" if len(conflicts) > 10 else ""
+        raise SystemExit(f"{len(conflicts)} conflicts, nothing merged (use --overwrite):\n  "
+                         + "\n  ".join(conflicts[:10]) + more)
+
+    for src, dst in todo:
+        if dst.exists():
+            dst.unlink()
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if link:
+            os.link(src, dst)
+        else:
+            shutil.copy2(src, dst)
+    return counts
+
+
+def check_manifests(shard_dir: Path) -> List[str]:
+    """
+    Problems found in the shard manifests: missing shards, items nobody ran.
+    """
+    problems: List[str] = []
+    groups: Dict[tuple, List[dict]] = {}
+    for mf in sorted(shard_dir.glob("shard_*/MANIFEST*.json")):
+        m = json.loads(mf.read_text(encoding="utf-8"))
+        groups.setdefault((m["num_shards"], m["by"], tuple(m["all"])), []).append(m)
+    for (n, by, items), ms in groups.items():
+        seen = {m["shard"] for m in ms}
+        missing = sorted(set(range(n)) - seen)
+        if missing:
+            problems.append(f"{len(items)} items / {n} shards ({by}): no manifest for shards {missing}")
+        done = {it for m in ms for it in m["items"]}
+        lost = [it for i, it in enumerate(items) if it not in done and shard_of(it, i, n, by) in seen]
+        if lost:
+            problems.append(f"items not covered: {lost[:5]}{' ...' if len(lost) > 5 else ''}")
+    return problems
+
+
+def write_cube(root: Path, out: Path) -> str:
+    """
+    Metrics cube of the merged tree (same axes as export_bundle.py) as .npz.
+    """
+    import numpy as np
+    from export_bundle import build_cube
+
+    files = sorted(root.glob("*_*/outputs/metrics_*.csv"))
+    if not files:
+        raise SystemExit(f"No <I>_<H>/outputs/metrics_*.csv under {root} for the cube")
+    axes, cube = build_cube(files)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(out, cube=cube, **{k: np.asarray(v) for k, v in axes.items()})
+    return " x ".join(str(n) for n in cube.shape)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Deterministic sweep sharding and merge of partial result stores.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_sel = sub.add_parser("select", help="Print the items of one shard (from arguments or stdin lines)")
+    p_sel.add_argument("items", nargs="*")
+    p_sel.add_argument("--shard", type=int, default=int(os.environ.get("SHARD", 0)))
+    p_sel.add_argument("--num-shards", type=int, default=int(os.environ.get("NUM_SHARDS", 1)))
+    p_sel.add_argument("--by", default=os.environ.get("SHARD_BY", "hash"), choices=SHARD_BY)
+    p_sel.add_argument("--keyed", action="store_true",
+                       help="stdin lines are '<key>\\t<payload>': shard on the key, print the payload")
+    p_sel.add_argument("--manifest", default=None, help="Write the shard assignment as JSON")
+
+    p_merge = sub.add_parser("merge", help="Merge shards/shard_*/ into the canonical tree")
+    p_merge.add_argument("--shard-dir", default=os.environ.get("SHARD_DIR", "shards"))
+    p_merge.add_argument("--dest", default=".")
+    p_merge.add_argument("--overwrite", action="store_true", help="Replace differing files instead of failing")
+    p_merge.add_argument("--link", action="store_true", help="Hard-link instead of copying (same file system)")
+    p_merge.add_argument("--cube", default=None, help="Also write the merged metrics cube (.npz)")
+
+    p_loc = sub.add_parser("run-local", help="Run a command once per shard as parallel local processes")
+    p_loc.add_argument("--num-shards", type=int, required=True)
+    p_loc.add_argument("--by", default="hash", choices=SHARD_BY)
+    p_loc.add_argument("command", nargs=argparse.REMAINDER, help="-- command (sees SHARD / NUM_SHARDS / SHARD_BY)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "select":
+        if args.items:
+            lines = list(args.items)
+        else:
+            lines = [ln.rstrip("\n") for ln in sys.stdin if ln.strip()]
+        if args.keyed:
+            payload = dict(ln.split("\t", 1) for ln in lines)
+            keys = list(payload)
+        else:
+            keys = lines
+        chosen = select(keys, args.shard, args.num_shards, args.by)
+        if args.manifest:
+            write_manifest(Path(args.manifest), args.shard, args.num_shards, args.by, keys, chosen)
+        for k in chosen:
+            print(payload[k] if args.keyed else k)
+
+    elif args.cmd == "merge":
+        shard_dir = Path(args.shard_dir)
+        for problem in check_manifests(shard_dir):
+            print(f"[warn] {problem}", file=sys.stderr)
+        counts = merge(shard_dir, Path(args.dest), overwrite=args.overwrite, link=args.link)
+        print(f"[OK] merged {shard_dir} -> {args.dest}: {counts['copied']} copied, "
+              f"{counts['identical']} identical, {counts['replaced']} replaced")
+        if args.cube:
+            shape = write_cube(Path(args.dest), Path(args.cube))
+            print(f"[OK] metrics cube {shape} -> {args.cube}")
+
+    else:
+        command = args.command[1:] if args.command[:1] == ["--"] else args.command
+        if not command:
+            ap.error("run-local needs a command after --")
+        procs = []
+        for k in range(args.num_shards):
+            env = dict(os.environ, SHARD=str(k), NUM_SHARDS=str(args.num_shards), SHARD_BY=args.by)
+            procs.append(subprocess.Popen(command, env=env))
+        codes = [p.wait() for p in procs]
+        failed = [k for k, c in enumerate(codes) if c != 0]
+        if failed:
+            raise SystemExit(f"shards {failed} failed")
+        print(f"[OK] {args.num_shards} shards finished; run `python3 shard.py merge` next")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Streaming per-pose error statistics with mergeable quantile sketches.
+
+evo_res tables need the full error array of every configuration x metric x
+alignment in memory. Here error_array.npy is streamed out of each evo result
+zip in fixed-size chunks into
+
+  exact running moments   n, mean, M2 (Chan/Welford), sse, min, max
+  a KLL quantile sketch   compactor levels of at most ~k items each; an
+                          item on level h stands for 2^h errors
+
+so memory per series is O(k log(n/k)) instead of O(n). Both parts merge:
+sketches of chunks, bag segments or sweep shards (shard.py) combine into the
+sketch of the whole run. rmse/mean/std/sse/min/max are exact; median and the
+extra quantiles have a normalized rank error of roughly 1.7/k (k=200: < 1%).
+Quantiles interpolate between neighbouring ranks like np.quantile, so up to k
+errors the median is exactly evo's np.median.
+
+  python3 streaming_stats.py summarize --root . --quantiles 0.9 0.95 0.99 --sketch-dir sketches/
+  python3 streaming_stats.py merge sketches/a/*.npz --out merged.npz
+
+summarize writes <I>_<H>/outputs/stream_<variant>.csv in the evo_res layout
+(result zip name, then the METRICS columns of analyze.py, then p90 ... ), so
+analyze.py --files */outputs/stream_aligned_se3.csv works as with the evo
+tables. --verify also loads the full arrays and prints the observed rank error.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from analyze import METRICS, infer_IH_from_path
+
+
+VARIANTS = ("raw", "aligned_se3", "aligned_sim3")
+# evo_res writes the statistics columns in this (alphabetical) order
+COLUMNS = tuple(sorted(METRICS))
+
+
+class Moments:
+    """
+    Exact running count, mean, M2, sum of squares, min and max.
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sse = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, x: np.ndarray) -> None:
+        if x.size == 0:
+            return
+        other = Moments()
+        other.n = int(x.size)
+        other.mean = float(x.mean())
+        d = x - other.mean
+        other.m2 = float(d @ d)
+        other.sse = float(x @ x)
+        other.min, other.max = float(x.min()), float(x.max())
+        self.merge(other)
+
+    def merge(self, other: "Moments") -> None:
+        """
+        Chan et al. parallel combination of (n, mean, M2).
+        """
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.sse += other.sse
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self.n = n
+
+    def as_array(self) -> np.ndarray:
+        return np.array([self.n, self.mean, self.m2, self.sse, self.min, self.max], dtype=np.float64)
+
+    @classmethod
+    def from_array(cls, a: np.ndarray) -> "Moments":
+        m = cls()
+        m.n = int(a[0])
+        m.mean, m.m2, m.sse, m.min, m.max = (float(v) for v in a[1:])
+        return m
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016) on NumPy arrays.
+
+    Level h holds items of weight 2^h with capacity ~k (2/3)^(top - h). A full
+    level is sorted and every other item (random offset) is promoted, so bulk
+    updates cost a few sorts instead of per-item work.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        if k < 8:
+            raise ValueError("k must be >= 8")
+        self.k = int(k)
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** (len(self.levels) - h - 1))))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            if self.levels[h].size > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                buf = np.sort(self.levels[h])
+                # an odd item stays behind so the promoted weight is exact
+                odd = buf.size % 2
+                promoted = buf[odd + int(self._rng.integers(2))::2]
+                self.levels[h] = buf[:odd]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def update(self, x: np.ndarray) -> None:
+        x = np.asarray(x, dtype=np.float64).reshape(-1)
+        if x.size == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], x])
+        self.n += int(x.size)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge sketches with k={self.k} and k={other.k}")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, buf in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], buf])
+        self.n += other.n
+        self._compress()
+
+    def size(self) -> int:
+        return sum(buf.size for buf in self.levels)
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Values at normalized ranks qs, linearly interpolated between the two
+        neighbouring ranks like np.quantile. An item of weight w stands for w
+        consecutive ranks, so while every item has weight 1 (n <= k) the
+        result equals np.quantile of the data (and the median np.median).
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(buf.size, 2.0 ** h) for h, buf in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cw = items[order], np.cumsum(weights[order])
+        rank = np.clip(qs, 0.0, 1.0) * (cw[-1] - 1.0)
+        lo = np.floor(rank)
+        at = lambda r: items[np.minimum(np.searchsorted(cw, r, side="right"), items.size - 1)]
+        v_lo, v_hi = at(lo), at(np.ceil(rank))
+        return v_lo + (rank - lo) * (v_hi - v_lo)
+
+
+class ErrorStats:
+    """
+    Moments + KLL sketch of one error series; exports the evo_res statistics.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.moments = Moments()
+        self.sketch = KLLSketch(k, seed)
+
+    def update(self, x: np.ndarray) -> None:
+        x = np.asarray(x, dtype=np.float64).reshape(-1)
+        x = x[np.isfinite(x)]
+        self.moments.update(x)
+        self.sketch.update(x)
+
+    def merge(self, other: "ErrorStats") -> None:
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Sketch quantiles; q = 0 and q = 1 are the exact min and max.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        out = self.sketch.quantiles(qs)
+        out[qs <= 0] = self.moments.min
+        out[qs >= 1] = self.moments.max
+        return out
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        {rmse, mean, median, std, min, max, sse} (analyze.METRICS); std is the population std as in evo.
+        """
+        m = self.moments
+        if m.n == 0:
+            return {k: float("nan") for k in METRICS}
+        return {
+            "rmse": float(np.sqrt(m.sse / m.n)),
+            "mean": m.mean,
+            "median": float(self.quantiles([0.5])[0]),
+            "std": float(np.sqrt(m.m2 / m.n)),
+            "min": m.min,
+            "max": m.max,
+            "sse": m.sse,
+        }
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, k=self.sketch.k, sketch_n=self.sketch.n, moments=self.moments.as_array(),
+                 sizes=np.array([b.size for b in self.sketch.levels]), items=np.concatenate(self.sketch.levels))
+
+    @classmethod
+    def load(cls, path: Path, seed: int = 0) -> "ErrorStats":
+        with np.load(path) as z:
+            st = cls(int(z["k"]), seed)
+            st.moments = Moments.from_array(z["moments"])
+            st.sketch.n = int(z["sketch_n"])
+            st.sketch.levels = np.split(z["items"], np.cumsum(z["sizes"])[:-1])
+        return st
+
+
+def iter_error_chunks(zip_path: Path, chunk: int = 1 << 16, member: str = "error_array.npy") -> Iterator[np.ndarray]:
+    """
+    Stream a 1-D .npy member of a zip in chunks of `chunk` values (never the whole array).
+    """
+    fmt = np.lib.format
+    with zipfile.ZipFile(zip_path) as z, z.open(member) as fh:
+        version = fmt.read_magic(fh)
+        read_header = fmt.read_array_header_1_0 if version == (1, 0) else fmt.read_array_header_2_0
+        shape, _, dtype = read_header(fh)
+        remaining = int(np.prod(shape))
+        while remaining > 0:
+            m = min(chunk, remaining)
+            buf = fh.read(m * dtype.itemsize)
+            if len(buf) < m * dtype.itemsize:
+                raise ValueError(f"{zip_path}:{member} is truncated")
+            yield np.frombuffer(buf, dtype=dtype)
+            remaining -= m
+
+
+def summarize_zip(zip_path: Path, *, k: int, chunk: int) -> ErrorStats:
+    st = ErrorStats(k)
+    for x in iter_error_chunks(zip_path, chunk):
+        st.update(x)
+    return st
+
+
+def quantile_columns(qs: Sequence[float]) -> List[str]:
+    return [f"p{100 * q:g}" for q in qs]
+
+
+def write_table(path: Path, rows: Dict[str, ErrorStats], qs: Sequence[float]) -> None:
+    """
+    evo_res-like table: result zip name, METRICS columns, then the quantile columns.
+    """
+    with path.open("w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["", *COLUMNS, *quantile_columns(qs)])
+        for name, st in sorted(rows.items()):
+            m = st.metrics()
+            w.writerow([name, *(repr(m[c]) for c in COLUMNS), *(repr(float(v)) for v in st.quantiles(qs))])
+
+
+def rank_error(st: ErrorStats, x: np.ndarray, qs: Sequence[float]) -> float:
+    """
+    Largest |rank(estimate)/n - q| against the exact array x.
+    """
+    xs = np.sort(x[np.isfinite(x)])
+    est = st.quantiles(qs)
+    lo = np.searchsorted(xs, est, side="left") / xs.size
+    hi = np.searchsorted(xs, est, side="right") / xs.size
+    qs = np.asarray(qs)
+    # any rank inside [lo, hi] is a valid position of the estimate
+    return float(np.max(np.maximum(0.0, np.maximum(lo - qs, qs - hi))))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Streaming error statistics and mergeable quantile sketches.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_sum = sub.add_parser("summarize", help="Stream the evo result zips of every <I>_<H> folder")
+    p_sum.add_argument("--root", default=".", help="Experiment root with <I>_<H>/outputs/<variant>/*.zip")
+    p_sum.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=VARIANTS)
+    p_sum.add_argument("--pattern", nargs="+", default=None, help="Zip name globs (default: all), e.g. pg_ape_*")
+    p_sum.add_argument("--quantiles", nargs="*", type=float, default=[0.9, 0.95, 0.99])
+    p_sum.add_argument("--k", type=int, default=200, help="KLL accuracy parameter (rank error ~1.7/k)")
+    p_sum.add_argument("--chunk", type=int, default=1 << 16, help="Values read per chunk")
+    p_sum.add_argument("--sketch-dir", default=None, help="Also save <I>_<H>/<variant>/<zip stem>.npz sketches")
+    p_sum.add_argument("--verify", action="store_true", help="Load full arrays and report the observed rank error")
+
+    p_merge = sub.add_parser("merge", help="Merge saved sketches (chunks, segments, shards) of one series")
+    p_merge.add_argument("sketches", nargs="+")
+    p_merge.add_argument("--quantiles", nargs="*", type=float, default=[0.9, 0.95, 0.99])
+    p_merge.add_argument("--out", default=None, help="Write the merged sketch (.npz)")
+    args = ap.parse_args(argv)
+
+    if any(not 0 <= q <= 1 for q in args.quantiles):
+        ap.error("--quantiles must lie in [0, 1]")
+
+    if args.cmd == "merge":
+        st = ErrorStats.load(Path(args.sketches[0]))
+        for p in args.sketches[1:]:
+            st.merge(ErrorStats.load(Path(p)))
+        m = st.metrics()
+        print(f"n={st.moments.n}  " + "  ".join(f"{c}={m[c]:.6g}" for c in COLUMNS))
+        print("  ".join(f"{c}={v:.6g}" for c, v in zip(quantile_columns(args.quantiles), st.quantiles(args.quantiles))))
+        if args.out:
+            st.save(Path(args.out))
+            print(f"[OK] merged {len(args.sketches)} sketches -> {args.out}")
+        return
+
+    t0 = time.perf_counter()
+    root = Path(args.root)
+    n_tables = n_values = n_items = 0
+    worst = 0.0
+    for outputs in sorted(root.glob("*_*/outputs")):
+        try:
+            I, H = infer_IH_from_path(outputs)
+        except ValueError:
+            continue
+        for variant in args.variants:
+            zips = sorted((outputs / variant).glob("*.zip"))
+            if args.pattern:
+                zips = [z for z in zips if any(z.match(f"{p}.zip") or z.match(p) for p in args.pattern)]
+            if not zips:
+                continue
+            rows: Dict[str, ErrorStats] = {}
+            for zp in zips:
+                st = summarize_zip(zp, k=args.k, chunk=args.chunk)
+                rows[zp.name] = st
+                n_values += st.moments.n
+                n_items += st.sketch.size()
+                if args.sketch_dir:
+                    st.save(Path(args.sketch_dir) / f"{I}_{H}" / variant / f"{zp.stem}.npz")
+                if args.verify:
+                    full = np.concatenate(list(iter_error_chunks(zp, args.chunk)) or [np.empty(0)])
+                    if full.size:
+                        worst = max(worst, rank_error(st, full.astype(np.float64), [0.5, *args.quantiles]))
+            write_table(outputs / f"stream_{variant}.csv", rows, args.quantiles)
+            n_tables += 1
+
+    if n_tables == 0:
+        raise SystemExit(f"No <I>_<H>/outputs/<variant>/*.zip under {root}")
+    print(f"{n_values} errors streamed, {n_items} sketch items kept ({n_items / max(n_values, 1):.2%})")
+    if args.verify:
+        print(f"max normalized rank error (median + quantiles): {worst:.4f}")
+    print(f"[OK] {n_tables} stream_<variant>.csv tables in {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Adaptive (I,H) sweep planner: a Gaussian-process surrogate of M(I,H).
+
+The measured cells are read from the metrics CSVs with analyze.build_matrix
+(same pattern / metric selection as analyze.py). A GP with an anisotropic RBF
+kernel on (log(1 + I), log(H)) is fitted to them; its hyperparameters are
+picked by the log marginal likelihood over a small grid, all in NumPy.
+
+Candidates come from an adaptive grid: a coarse geometric grid over the
+bounds plus the log-midpoints between neighbouring measured I and H values,
+so the resolution grows wherever runs have been made. The next --n configs
+are chosen greedily by expected improvement (or posterior std / lower
+confidence bound); after each pick the GP is conditioned on its own
+prediction (kriging believer) so a batch does not collapse onto one cell.
+
+  python3 sweep_planner.py --files */outputs/metrics_aligned_se3.csv \\
+      --pattern pg_ape_se3 --metric rmse --n 4 --out next_exps.txt
+  EXPS_FILE=next_exps.txt ./run_evo.sh
+
+Proposals are printed and written as <I>_<H> folder names, one per line.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from analyze import METRICS, build_matrix
+
+
+ACQUISITIONS = ("ei", "lcb", "std")
+_SQRT2 = np.sqrt(2.0)
+
+
+def features(IH: np.ndarray) -> np.ndarray:
+    """
+    (N, 2) integer (I, H) -> GP inputs (log(1 + I), log(H)).
+    """
+    IH = np.asarray(IH, dtype=float)
+    return np.stack([np.log1p(IH[:, 0]), np.log(np.maximum(IH[:, 1], 1.0))], axis=1)
+
+
+def _rbf(a: np.ndarray, b: np.ndarray, ell: np.ndarray) -> np.ndarray:
+    d = (a[:, None, :] - b[None, :, :]) / ell
+    return np.exp(-0.5 * np.sum(d * d, axis=-1))
+
+
+def _norm_cdf(z: np.ndarray) -> np.ndarray:
+    from math import erf
+    return 0.5 * (1.0 + np.vectorize(erf)(z / _SQRT2))
+
+
+def _norm_pdf(z: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * z * z) / np.sqrt(2.0 * np.pi)
+
+
+class GPSurrogate:
+    """
+    Zero-mean GP on standardized targets with an anisotropic RBF kernel.
+    """
+
+    def __init__(self, lengthscales: Sequence[float] = (0.25, 0.5, 1.0, 2.0, 4.0),
+                 noises: Sequence[float] = (1e-4, 1e-3, 1e-2, 1e-1)):
+        self.lengthscales = tuple(lengthscales)
+        self.noises = tuple(noises)
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "GPSurrogate":
+        """
+        Pick (ell_I, ell_H, noise) by the log marginal likelihood and factor K.
+        """
+        self.X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.y_mu = float(y.mean())
+        self.y_sd = float(y.std()) or 1.0
+        z = (y - self.y_mu) / self.y_sd
+        n = z.size
+        best = None
+        for l1, l2, s2 in itertools.product(self.lengthscales, self.lengthscales, self.noises):
+            ell = np.array([l1, l2])
+            K = _rbf(self.X, self.X, ell) + s2 * np.eye(n)
+            try:
+                L = np.linalg.cholesky(K)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(L.T, np.linalg.solve(L, z))
+            lml = -0.5 * z @ alpha - np.log(np.diag(L)).sum() - 0.5 * n * np.log(2.0 * np.pi)
+            if best is None or lml > best[0]:
+                best = (lml, ell, s2, L, alpha)
+        if best is None:
+            raise RuntimeError("GP fit failed for every hyperparameter setting")
+        self.lml, self.ell, self.noise, self._L, self._alpha = best
+        return self
+
+    def condition(self, X: np.ndarray, y: np.ndarray) -> "GPSurrogate":
+        """
+        Refactor with new data but the already selected hyperparameters.
+        """
+        self.X = np.asarray(X, dtype=float)
+        z = (np.asarray(y, dtype=float) - self.y_mu) / self.y_sd
+        K = _rbf(self.X, self.X, self.ell) + self.noise * np.eye(z.size)
+        self._L = np.linalg.cholesky(K)
+        self._alpha = np.linalg.solve(self._L.T, np.linalg.solve(self._L, z))
+        return self
+
+    def predict(self, Xs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Posterior mean and std (in metric units) at Xs.
+        """
+        Ks = _rbf(np.asarray(Xs, dtype=float), self.X, self.ell)
+        mu = Ks @ self._alpha
+        v = np.linalg.solve(self._L, Ks.T)
+        var = np.maximum(1.0 - np.sum(v * v, axis=0), 1e-12)
+        return self.y_mu + self.y_sd * mu, self.y_sd * np.sqrt(var)
+
+
+def acquisition(mu: np.ndarray, sd: np.ndarray, best: float, kind: str, kappa: float = 2.0) -> np.ndarray:
+    """
+    Score to maximize; the metric itself is minimized (errors).
+    """
+    if kind == "std":
+        return sd
+    if kind == "lcb":
+        return -(mu - kappa * sd)
+    z = (best - mu) / sd
+    return (best - mu) * _norm_cdf(z) + sd * _norm_pdf(z)
+
+
+def axis_candidates(measured: Sequence[int], lo: int, hi: int, coarse: int, *, log1p: bool) -> List[int]:
+    """
+    Coarse geometric grid on [lo, hi] plus log-midpoints between measured values.
+    """
+    f, finv = (np.log1p, np.expm1) if log1p else (np.log, np.exp)
+    vals = set(int(v) for v in measured if lo <= v <= hi)
+    vals.update(int(round(v)) for v in finv(np.linspace(f(lo), f(hi), coarse)))
+    m = sorted(set(int(v) for v in measured))
+    for a, b in zip(m[:-1], m[1:]):
+        mid = int(round(finv(0.5 * (f(a) + f(b)))))
+        if a < mid < b:
+            vals.add(mid)
+    return sorted(v for v in vals if lo <= v <= hi)
+
+
+def propose(
+    observed: np.ndarray,
+    values: np.ndarray,
+    candidates: np.ndarray,
+    n: int,
+    *,
+    kind: str = "ei",
+    kappa: float = 2.0,
+) -> Tuple[List[Tuple[int, int]], GPSurrogate]:
+    """
+    Greedy batch of n (I, H) cells from candidates (kriging believer).
+    """
+    gp = GPSurrogate().fit(features(observed), values)
+    X, y = features(observed), np.asarray(values, dtype=float)
+    best = float(y.min())
+    seen = {tuple(r) for r in observed.tolist()}
+    pool = np.array([c for c in candidates.tolist() if tuple(c) not in seen], dtype=int).reshape(-1, 2)
+    picks: List[Tuple[int, int]] = []
+    for _ in range(min(n, len(pool))):
+        mu, sd = gp.predict(features(pool))
+        k = int(np.argmax(acquisition(mu, sd, best, kind, kappa)))
+        picks.append((int(pool[k, 0]), int(pool[k, 1])))
+        X = np.vstack([X, features(pool[k:k + 1])])
+        y = np.append(y, mu[k])
+        pool = np.delete(pool, k, axis=0)
+        gp.condition(X, y)
+    gp.condition(features(observed), values)
+    return picks, gp
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Propose the next (I,H) experiments from a GP surrogate of M(I,H).")
+    ap.add_argument("--files", nargs="+", required=True, help="Metrics CSV paths of the runs made so far")
+    ap.add_argument("--pattern", required=True, help="PG pattern name, e.g. pg_ape_se3")
+    ap.add_argument("--metric", default="rmse", choices=METRICS, help="Scalar to minimize")
+    ap.add_argument("--allow-contains", action="store_true", help="Pattern match using contains if exact match fails")
+    ap.add_argument("--n", type=int, default=4, help="Number of configurations to propose")
+    ap.add_argument("--acquisition", default="ei", choices=ACQUISITIONS,
+                    help="ei: expected improvement, lcb: lower confidence bound, std: pure exploration")
+    ap.add_argument("--kappa", type=float, default=2.0, help="LCB exploration weight")
+    ap.add_argument("--i-range", nargs=2, type=int, default=[0, 500], metavar=("MIN", "MAX"))
+    ap.add_argument("--h-range", nargs=2, type=int, default=[1, 20], metavar=("MIN", "MAX"))
+    ap.add_argument("--coarse", type=int, default=5, help="Points per axis of the coarse geometric grid")
+    ap.add_argument("--grid-csv", default=None, help="Also write mean/std/acquisition over the candidate grid")
+    ap.add_argument("--out", default=None, help="Write proposals as <I>_<H> lines (e.g. EXPS_FILE for run_evo.sh)")
+    args = ap.parse_args()
+
+    mat = build_matrix([Path(f) for f in args.files], pattern=args.pattern, metric=args.metric,
+                       allow_contains=args.allow_contains)
+    obs = [(I, H, mat.get(I, H)) for I in mat.index for H in mat.columns if np.isfinite(mat.get(I, H))]
+    if len(obs) < 2:
+        raise SystemExit("Need at least two measured (I,H) cells")
+    observed = np.array([(I, H) for I, H, _ in obs], dtype=int)
+    values = np.array([v for _, _, v in obs])
+
+    Is = axis_candidates(observed[:, 0], *args.i_range, args.coarse, log1p=True)
+    Hs = axis_candidates(observed[:, 1], *args.h_range, args.coarse, log1p=False)
+    candidates = np.array(list(itertools.product(Is, Hs)), dtype=int)
+
+    picks, gp = propose(observed, values, candidates, args.n, kind=args.acquisition, kappa=args.kappa)
+
+    k_best = int(np.argmin(values))
+    print(f"measured cells: {len(obs)}  best: {observed[k_best, 0]}_{observed[k_best, 1]} "
+          f"{args.metric}={values[k_best]:.4f}")
+    print(f"GP: ell(log1p I)={gp.ell[0]:.2f}  ell(log H)={gp.ell[1]:.2f}  noise={gp.noise:g}  lml={gp.lml:.2f}")
+    print(f"candidate grid: {len(Is)} I x {len(Hs)} H = {len(candidates)} cells")
+    if picks:
+        mu, sd = gp.predict(features(np.array(picks)))
+        for (I, H), m, s in zip(picks, mu, sd):
+            print(f"  {I}_{H}  predicted {args.metric} {m:.4f} +- {s:.4f}")
+
+    if args.grid_csv:
+        mu, sd = gp.predict(features(candidates))
+        acq = acquisition(mu, sd, float(values.min()), args.acquisition, args.kappa)
+        measured = {tuple(r) for r in observed.tolist()}
+        with open(args.grid_csv, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(["I", "H", "measured", "mean", "std", args.acquisition])
+            for (I, H), m, s, a in zip(candidates.tolist(), mu, sd, acq):
+                w.writerow([I, H, int((I, H) in measured), f"{m:.6f}", f"{s:.6f}", f"{a:.6g}"])
+    if args.out:
+        Path(args.out).write_text("".join(f"{I}_{H}\n" for I, H in picks), encoding="utf-8")
+        print(f"[OK] {len(picks)} proposals -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()